@@ -0,0 +1,122 @@
+"""
+Numba kernels for dial-driven hot paths
+- score_candidates: calculate_dial_scores fused with the base/dial score blend
+- steer_query: SteeringVectorEngine.apply_steering in one pass
+"""
+import math
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def score_candidates(indices, base_scores, dial_matrix, dial_norms, user_vec, base_weight, dial_weight):
+        """
+        Score FAISS candidates against the user's dials
+        
+        Args:
+            indices: Candidate document rows, int64 (n,)
+            base_scores: Candidate similarities, float32 (n,)
+            dial_matrix: Document dial annotations, float32 (n_docs, n_dials)
+            dial_norms: Row norms of dial_matrix, float32 (n_docs,)
+            user_vec: User dials, float32 (n_dials,)
+            base_weight, dial_weight: Blend weights for the final score
+        
+        Returns:
+            (final_scores, dial_scores), both float32 (n,)
+        """
+        n = indices.shape[0]
+        n_dials = user_vec.shape[0]
+        
+        user_norm = 0.0
+        for j in range(n_dials):
+            user_norm += user_vec[j] * user_vec[j]
+        user_norm = np.sqrt(user_norm)
+        
+        final_scores = np.empty(n, dtype=np.float32)
+        dial_scores = np.empty(n, dtype=np.float32)
+        for i in prange(n):
+            row = indices[i]
+            dot = 0.0
+            for j in range(n_dials):
+                dot += dial_matrix[row, j] * user_vec[j]
+            
+            # Cosine mapped to [0, 1]; neutral 0.5 for all-zero vectors
+            norm = dial_norms[row] * user_norm
+            score = 0.5 if norm == 0.0 else (dot / norm + 1.0) / 2.0
+            
+            dial_scores[i] = score
+            final_scores[i] = base_weight * base_scores[i] + dial_weight * score
+        
+        return final_scores, dial_scores
+    
+    @njit(cache=True, fastmath=True, boundscheck=False)
+    def steer_query(query, steering_matrix, dials_vec, strength, out):
+        """
+        Add dial-weighted steering vectors to a query and L2-normalize
+        
+        Args:
+            query: Query embedding, float32 (dim,)
+            steering_matrix: One steering vector per dial, float32 (n_dials, dim)
+            dials_vec: Dial values in [0, 1], float32 (n_dials,); 0.5 is neutral
+            strength: Overall steering strength
+            out: Destination, float32 (dim,); may be query itself
+        
+        Returns:
+            out, holding the steered unit vector
+        """
+        for j in range(out.shape[0]):
+            out[j] = query[j]
+        for i in range(steering_matrix.shape[0]):
+            weight = (dials_vec[i] - 0.5) * 2.0 * strength
+            for j in range(out.shape[0]):
+                out[j] += weight * steering_matrix[i, j]
+        
+        norm_sq = 0.0
+        for j in range(out.shape[0]):
+            norm_sq += out[j] * out[j]
+        scale = 1.0 / (math.sqrt(norm_sq) + 1e-8)
+        for j in range(out.shape[0]):
+            out[j] *= scale
+        return out
+
+
+def warmup():
+    """Compile (or load from cache) the kernel for the dtypes retrieve() uses"""
+    if not NUMBA_AVAILABLE:
+        return
+    
+    # A dial matrix loaded from disk is a read-only memmap, which numba
+    # types separately from the in-memory one built by rebuild_index()
+    dial_matrix = np.zeros((1, 5), dtype=np.float32)
+    read_only = dial_matrix.copy()
+    read_only.flags.writeable = False
+    
+    for matrix in (dial_matrix, read_only):
+        score_candidates(
+            np.zeros(1, dtype=np.int64),
+            np.zeros(1, dtype=np.float32),
+            matrix,
+            np.zeros(1, dtype=np.float32),
+            np.zeros(5, dtype=np.float32),
+            0.7,
+            0.3
+        )
+
+
+def warmup_steering():
+    """Compile (or load from cache) steer_query for float32 inputs"""
+    if not NUMBA_AVAILABLE:
+        return
+    steer_query(
+        np.zeros(4, dtype=np.float32),
+        np.zeros((5, 4), dtype=np.float32),
+        np.zeros(5, dtype=np.float32),
+        1.0,
+        np.zeros(4, dtype=np.float32)
+    )
@@ -0,0 +1,25 @@
+"""
+Thread offloading for blocking calls made from async code
+- to_thread_fast: asyncio.to_thread without the context copy when no contextvars are set
+"""
+import asyncio
+import contextvars
+import functools
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+async def to_thread_fast(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run `func(*args, **kwargs)` in the default executor
+
+    Same as asyncio.to_thread, except that an empty context (nothing in this
+    app sets contextvars) is not copied and entered around the call.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(func, *args, **kwargs)
+    if len(ctx):
+        call = functools.partial(ctx.run, call)
+    return await loop.run_in_executor(None, call)
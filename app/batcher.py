@@ -0,0 +1,78 @@
+"""
+Query Micro-Batcher
+Coalesces concurrent retrieval queries into a single embedding call
+"""
+import asyncio
+import numpy as np
+from typing import Optional
+
+from .embed import EmbeddingEngine
+
+
+# Defaults for the coalescing window
+MAX_BATCH = 32
+MAX_WAIT_MS = 10.0
+
+
+class QueryBatcher:
+    """
+    Micro-batches concurrent query embeddings into one encoder pass
+    
+    Queries arriving within `max_wait_ms` of each other (up to `max_batch`)
+    are embedded together, which amortizes kernel launches and Python
+    overhead across requests instead of running one forward pass each.
+    """
+    
+    def __init__(
+        self,
+        embedding_engine: EmbeddingEngine,
+        max_batch: int = MAX_BATCH,
+        max_wait_ms: float = MAX_WAIT_MS
+    ):
+        self.embedding_engine = embedding_engine
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+    
+    async def submit(self, query: str) -> np.ndarray:
+        """Queue a query and wait for its embedding"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, future))
+        return await future
+    
+    async def _run(self):
+        """Background loop: collect a batch, embed it off the event loop, resolve futures"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Similar lengths side by side keeps padding waste down
+            batch.sort(key=lambda item: len(item[0]))
+            
+            try:
+                embeddings = await asyncio.to_thread(
+                    self.embedding_engine.embed,
+                    [query for query, _ in batch],
+                    self.max_batch
+                )
+                for (_, future), embedding in zip(batch, embeddings):
+                    if not future.done():
+                        future.set_result(embedding)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
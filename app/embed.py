@@ -2,15 +2,30 @@
 Embedding Engine with Contrastive Learning Support
 Uses contrastive pairs to fine-tune embeddings for better semantic understanding
 """
-import pandas as pd
+import csv
 import numpy as np
 from sentence_transformers import SentenceTransformer, losses, InputExample
 from torch.utils.data import DataLoader
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 import torch
 import os
+import contextlib
+import threading
+from collections import OrderedDict
 from pathlib import Path
 
+try:
+    from peft import LoraConfig, get_peft_model
+    PEFT_AVAILABLE = True
+except ImportError:
+    PEFT_AVAILABLE = False
+
+try:
+    import simsimd
+    SIMSIMD_AVAILABLE = True
+except ImportError:
+    SIMSIMD_AVAILABLE = False
+
 
 class EmbeddingEngine:
     """
@@ -26,18 +41,39 @@ class EmbeddingEngine:
         self,
         model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
         contrastive_pairs_path: Optional[str] = None,
-        device: Optional[str] = None
+        device: Optional[str] = None,
+        bf16: bool = True,
+        compile: bool = False,
+        cache_size: int = 4096
     ):
         self.model_name = model_name
         self.contrastive_pairs_path = contrastive_pairs_path
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.bf16 = bf16  # Mixed-precision fine-tuning on CUDA
         
         # Load base model
         self.model = SentenceTransformer(model_name, device=self.device)
         self.embedding_dim = self.model.get_sentence_embedding_dimension()
         
+        # LRU cache of text -> embedding (4096 x 384 x 4 B ~= 6 MB)
+        self.cache_size = cache_size
+        self._embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # embed() runs on the batcher worker, to_thread workers and the event loop at once
+        self._cache_lock = threading.Lock()
+        
+        # Optionally compile the transformer forward (fused kernels + CUDA graphs)
+        self.compiled = False
+        if compile and hasattr(torch, "compile"):
+            self.model[0].auto_model = torch.compile(
+                self.model[0].auto_model,
+                mode="reduce-overhead",
+                dynamic=True
+            )
+            self.compiled = True
+        
         # Load contrastive pairs if provided
         self.contrastive_pairs = None
+        self.contrastive_format = None  # "triplet" or "labeled"
         if contrastive_pairs_path and os.path.exists(contrastive_pairs_path):
             self.contrastive_pairs = self._load_contrastive_pairs(contrastive_pairs_path)
             print(f"✅ Loaded {len(self.contrastive_pairs)} contrastive pairs")
@@ -48,31 +84,36 @@ class EmbeddingEngine:
         Expected format: anchor, positive, negative (optional)
         Or: text1, text2, label (1 for similar, 0 for dissimilar)
         """
-        df = pd.read_csv(path)
-        examples = []
-        
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            columns = set(reader.fieldnames or [])
+            rows = list(reader)
+
         # Check format
-        if 'anchor' in df.columns and 'positive' in df.columns:
+        if 'anchor' in columns and 'positive' in columns:
             # Triplet format: anchor, positive, negative
-            for idx, row in df.iterrows():
-                if 'negative' in df.columns and pd.notna(row['negative']):
-                    # Triplet with negative
-                    examples.append(InputExample(
-                        texts=[row['anchor'], row['positive'], row['negative']]
-                    ))
-                else:
-                    # Pair format (positive)
-                    examples.append(InputExample(
-                        texts=[row['anchor'], row['positive']],
-                        label=1.0
-                    ))
-        elif 'text1' in df.columns and 'text2' in df.columns and 'label' in df.columns:
+            self.contrastive_format = "triplet"
+            if 'negative' in columns:
+                examples = [
+                    # Triplet with negative, or pair format (positive)
+                    InputExample(texts=[row['anchor'], row['positive'], row['negative']])
+                    if row['negative']
+                    else InputExample(texts=[row['anchor'], row['positive']], label=1.0)
+                    for row in rows
+                ]
+            else:
+                # Pair format (positive)
+                examples = [
+                    InputExample(texts=[row['anchor'], row['positive']], label=1.0)
+                    for row in rows
+                ]
+        elif 'text1' in columns and 'text2' in columns and 'label' in columns:
             # Pair format with similarity labels
-            for idx, row in df.iterrows():
-                examples.append(InputExample(
-                    texts=[row['text1'], row['text2']],
-                    label=float(row['label'])
-                ))
+            self.contrastive_format = "labeled"
+            examples = [
+                InputExample(texts=[row['text1'], row['text2']], label=float(row['label']))
+                for row in rows
+            ]
         else:
             raise ValueError(
                 "Contrastive pairs CSV must have either:\n"
@@ -87,7 +128,9 @@ class EmbeddingEngine:
         epochs: int = 3,
         batch_size: int = 16,
         warmup_steps: int = 100,
-        output_path: str = "models/finetuned_model"
+        output_path: str = "models/finetuned_model",
+        use_lora: bool = True,
+        lora_r: int = 16
     ) -> Dict:
         """
         Fine-tune the embedding model using contrastive pairs
@@ -96,6 +139,14 @@ class EmbeddingEngine:
         - Semantic similarity understanding
         - Domain-specific concept relationships
         - Distinction between related but different concepts
+        
+        With use_lora, only low-rank adapters on the attention projections
+        are trained, which frees enough VRAM to raise batch_size.
+        
+        Anchor/positive(/negative) data is trained with
+        MultipleNegativesRankingLoss, where every other positive in the batch
+        acts as a negative (batch_size - 1 negatives per anchor). Use a larger
+        batch_size (64-256) for that format.
         """
         if not self.contrastive_pairs:
             raise ValueError("No contrastive pairs loaded for training")
@@ -110,20 +161,57 @@ class EmbeddingEngine:
         )
         
         # Choose appropriate loss function based on data format
-        # For pairs with similarity scores
-        train_loss = losses.CosineSimilarityLoss(self.model)
+        if self.contrastive_format == "labeled":
+            # For pairs with similarity scores
+            train_loss = losses.CosineSimilarityLoss(self.model)
+        else:
+            # For anchor/positive pairs and triplets: in-batch negatives
+            train_loss = losses.MultipleNegativesRankingLoss(self.model)
         
-        # For triplets (anchor, positive, negative)
-        # train_loss = losses.TripletLoss(self.model)
+        # Inject LoRA adapters (requires `peft`)
+        lora_applied = False
+        if use_lora:
+            if PEFT_AVAILABLE:
+                lora_config = LoraConfig(
+                    r=lora_r,
+                    lora_alpha=lora_r * 2,
+                    target_modules=["query", "key", "value"],
+                    lora_dropout=0.05,
+                    bias="none"
+                )
+                self.model[0].auto_model = get_peft_model(self.model[0].auto_model, lora_config)
+                lora_applied = True
+            else:
+                print("⚠️  peft not installed - falling back to full fine-tuning")
         
-        # Fine-tune
-        self.model.fit(
-            train_objectives=[(train_dataloader, train_loss)],
-            epochs=epochs,
-            warmup_steps=warmup_steps,
-            show_progress_bar=True
+        # Mixed precision: bf16 autocast on Ampere+ (no loss scaling needed),
+        # fp16 AMP on older GPUs, full fp32 on CPU. Optimizer state stays fp32.
+        use_amp = self.bf16 and self.device.startswith("cuda")
+        use_bf16 = use_amp and torch.cuda.is_bf16_supported()
+        precision = "bf16" if use_bf16 else ("fp16" if use_amp else "fp32")
+        autocast = (
+            torch.autocast(device_type="cuda", dtype=torch.bfloat16)
+            if use_bf16 else contextlib.nullcontext()
         )
         
+        # Fine-tune
+        with autocast:
+            self.model.fit(
+                train_objectives=[(train_dataloader, train_loss)],
+                epochs=epochs,
+                warmup_steps=warmup_steps,
+                show_progress_bar=True,
+                use_amp=use_amp and not use_bf16
+            )
+        
+        # Merge adapters back into the base weights so the saved model loads without peft
+        if lora_applied:
+            self.model[0].auto_model = self.model[0].auto_model.merge_and_unload()
+        
+        # Cached embeddings came from the old weights
+        with self._cache_lock:
+            self._embedding_cache.clear()
+        
         # Save fine-tuned model
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
         self.model.save(output_path)
@@ -134,31 +222,124 @@ class EmbeddingEngine:
             "epochs": epochs,
             "training_pairs": len(self.contrastive_pairs),
             "model_path": output_path,
-            "embedding_dim": self.embedding_dim
+            "embedding_dim": self.embedding_dim,
+            "loss": type(train_loss).__name__,
+            "precision": precision,
+            "lora_rank": lora_r if lora_applied else None
         }
     
-    def embed(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+    def embed(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        return_tensor: bool = False,
+        use_cache: bool = True
+    ) -> Union[np.ndarray, torch.Tensor]:
         """
         Generate embeddings for a list of texts
         
         Args:
             texts: List of text strings to embed
             batch_size: Batch size for encoding
+            return_tensor: Return a torch tensor on the model device instead
+                of a numpy array (skips the device -> host copy and the cache)
+            use_cache: Read and fill the query LRU cache; pass False for bulk
+                corpus embedding so it doesn't evict every cached query
+        
+        Returns:
+            numpy array (or tensor) of shape (len(texts), embedding_dim)
+        """
+        if not texts:
+            if return_tensor:
+                return torch.empty((0, self.embedding_dim), dtype=torch.float32, device=self.device)
+            return np.empty((0, self.embedding_dim), dtype=np.float32)
+        
+        if return_tensor:
+            with torch.inference_mode():
+                return self.model.encode(
+                    texts,
+                    batch_size=batch_size,
+                    show_progress_bar=len(texts) > 100,
+                    convert_to_numpy=False,
+                    convert_to_tensor=True,
+                    normalize_embeddings=True
+                )
+        
+        if not use_cache:
+            with torch.inference_mode():
+                return self.model.encode(
+                    texts,
+                    batch_size=batch_size,
+                    show_progress_bar=len(texts) > 100,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                ).astype(np.float32, copy=False)
+        
+        # Serve repeated texts from the LRU cache; encode only the misses
+        cache = self._embedding_cache
+        embeddings = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+        misses: Dict[str, List[int]] = {}
+        with self._cache_lock:
+            for i, text in enumerate(texts):
+                cached = cache.get(text)
+                if cached is None:
+                    misses.setdefault(text, []).append(i)
+                else:
+                    cache.move_to_end(text)
+                    embeddings[i] = cached
+        
+        if misses:
+            miss_texts = list(misses)
+            # inference_mode is thread-local, so it is entered here rather than by callers
+            with torch.inference_mode():
+                encoded = self.model.encode(
+                    miss_texts,
+                    batch_size=batch_size,
+                    show_progress_bar=len(miss_texts) > 100,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True  # L2 normalization for cosine similarity
+                )
+            for text, embedding in zip(miss_texts, encoded):
+                embeddings[misses[text]] = embedding
+            
+            with self._cache_lock:
+                for text, embedding in zip(miss_texts, encoded):
+                    cache[text] = embedding.copy()
+                while len(cache) > self.cache_size:
+                    cache.popitem(last=False)
+        
+        return embeddings
+    
+    def embed_large(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        workers: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Embed a large corpus by sharding it across processes
+        
+        Uses all visible GPUs, or `workers` CPU processes on CPU-only hosts.
         
         Returns:
             numpy array of shape (len(texts), embedding_dim)
         """
         if not texts:
-            return np.array([])
-        
-        embeddings = self.model.encode(
-            texts,
-            batch_size=batch_size,
-            show_progress_bar=len(texts) > 100,
-            convert_to_numpy=True,
-            normalize_embeddings=True  # L2 normalization for cosine similarity
-        )
+            return np.empty((0, self.embedding_dim), dtype=np.float32)
+        
+        target_devices = None
+        if self.device == "cpu":
+            target_devices = ["cpu"] * (workers or os.cpu_count() or 1)
         
+        pool = self.model.start_multi_process_pool(target_devices=target_devices)
+        try:
+            embeddings = self.model.encode_multi_process(texts, pool, batch_size=batch_size)
+        finally:
+            self.model.stop_multi_process_pool(pool)
+        
+        # encode_multi_process does not normalize; match embed()
+        embeddings = embeddings.astype(np.float32, copy=False)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
         return embeddings
     
     def embed_single(self, text: str) -> np.ndarray:
@@ -172,12 +353,56 @@ class EmbeddingEngine:
         Returns:
             Similarity score between -1 and 1 (higher = more similar)
         """
-        emb1 = self.embed_single(text1)
-        emb2 = self.embed_single(text2)
+        # Encode both texts in a single forward pass (cache hits skip it)
+        emb1, emb2 = self.embed([text1, text2])
+
+        # embeddings are L2-normalized; cosine == dot, so don't divide by norms
+        assert abs(np.vdot(emb1, emb1) - 1.0) < 1e-4, "embeddings must be unit-norm"
+        return float(np.vdot(emb1, emb2))
+    
+    def embed_and_search(self, query: str, corpus_embeddings: torch.Tensor) -> torch.Tensor:
+        """
+        Score a query against a corpus of normalized embeddings
+        
+        Args:
+            query: Query text
+            corpus_embeddings: Tensor of shape (n, embedding_dim), e.g. from
+                embed(..., return_tensor=True)
+        
+        Returns:
+            Tensor of shape (n,) with cosine similarities
+        """
+        query_embedding = self.embed([query], return_tensor=True)[0]
+        corpus_embeddings = corpus_embeddings.to(query_embedding.device, query_embedding.dtype)
+        return torch.mv(corpus_embeddings, query_embedding)
+    
+    def similarity_matrix(
+        self,
+        queries: np.ndarray,
+        corpus: np.ndarray,
+        int8: bool = False
+    ) -> np.ndarray:
+        """
+        Pairwise cosine similarity between query and corpus embeddings
+        
+        Uses SimSIMD's SIMD kernels when installed, NumPy matmul otherwise.
+        With int8=True the (unit-norm) vectors are quantized to int8 first,
+        which is faster on large corpora at a small accuracy cost.
+        
+        Returns:
+            numpy array of shape (len(queries), len(corpus))
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        corpus = np.ascontiguousarray(corpus, dtype=np.float32)
+        
+        if not SIMSIMD_AVAILABLE:
+            return queries @ corpus.T
+        
+        if int8:
+            queries = (queries * 127).astype(np.int8)
+            corpus = (corpus * 127).astype(np.int8)
         
-        # Cosine similarity (embeddings are already normalized)
-        similarity = np.dot(emb1, emb2)
-        return float(similarity)
+        return 1 - np.asarray(simsimd.cdist(queries, corpus, metric="cosine"))
     
     def get_model_info(self) -> Dict:
         """Get information about the current model"""
@@ -185,5 +410,7 @@ class EmbeddingEngine:
             "model_name": self.model_name,
             "embedding_dim": self.embedding_dim,
             "device": self.device,
+            "compiled": self.compiled,
+            "cached_embeddings": len(self._embedding_cache),
             "contrastive_pairs_loaded": len(self.contrastive_pairs) if self.contrastive_pairs else 0
         }
@@ -3,15 +3,56 @@ LLM Integration with Gemma
 Generates responses using retrieved context and semantic dial adjustments
 """
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
 from typing import List, Dict, Optional
 import json
 import os
+import importlib.util
 from dotenv import load_dotenv
 
 # Load environment variables (optional)
 load_dotenv()
 
+# Dials at or above this value add their instruction to the prompt
+DIAL_THRESHOLD = 0.7
+
+# Instruction per dial, in bit order of the dial mask
+DIAL_INSTRUCTIONS = (
+    ("love", "Use a warm, empathetic, and compassionate tone"),  # warm, empathetic tone
+    ("commitment", "Focus on long-term perspectives and sustained dedication"),  # long-term focus
+    ("belonging", "Emphasize community, connection, and shared experiences"),  # community emphasis
+    ("trust", "Highlight trust, security, and reliability"),  # security and reliability
+    ("growth", "Focus on personal development and learning"),  # development focus
+)
+
+
+def _build_dial_mask_table() -> Dict[int, str]:
+    """Precompute the instruction text for all 32 combinations of high dials"""
+    table = {}
+    for mask in range(1 << len(DIAL_INSTRUCTIONS)):
+        instructions = [
+            sentence for bit, (_, sentence) in enumerate(DIAL_INSTRUCTIONS)
+            if mask >> bit & 1
+        ]
+        table[mask] = ". ".join(instructions) + "." if instructions else "Provide a balanced, informative response"
+    return table
+
+
+_DIAL_MASK_TABLE = _build_dial_mask_table()
+
+# Static Gemma prompt text around the variable slots:
+# context, response guidelines, emphasis areas, user question
+PROMPT_SCAFFOLD = (
+    "<start_of_turn>user\n"
+    "You are a helpful assistant specializing in relationships, emotional intelligence, and personal development.\n\n"
+    "**Context from Knowledge Base:**\n",
+    "\n\n**Response Guidelines:**\n",
+    "\n\n**Emphasis Areas:** ",
+    "\n\n**User Question:**\n",
+    "\n\nPlease provide a thoughtful response based on the context provided, following the guidelines above.<end_of_turn>\n"
+    "<start_of_turn>model\n",
+)
+
 
 class GemmaLLM:
     """
@@ -27,7 +68,9 @@ class GemmaLLM:
         self,
         model_name: str = "google/gemma-2b-it",  # or "google/gemma-7b-it" for better quality
         device: Optional[str] = None,
-        max_length: int = 512
+        max_length: int = 512,
+        quantization: Optional[str] = "int4",
+        static_cache: bool = True
     ):
         """
         Initialize Gemma model
@@ -36,9 +79,13 @@ class GemmaLLM:
             model_name: Gemma model variant (2b or 7b)
             device: Device to run on (cuda/cpu)
             max_length: Maximum generation length
+            quantization: "int4" (NF4), "int8", or None for fp16 weights (CUDA only)
+            static_cache: Use a preallocated KV cache and compiled decode step (CUDA only)
         """
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
         self.max_length = max_length
+        # bitsandbytes kernels are CUDA-only; CPU always loads full-precision weights
+        self.quantization = quantization if self.device == "cuda" else None
         
         # Get Hugging Face token if available (optional)
         hf_token = os.getenv("HF_TOKEN")
@@ -58,10 +105,31 @@ class GemmaLLM:
         if self.tokenizer.pad_token is None:
             self.tokenizer.pad_token = self.tokenizer.eos_token
         
+        # Left padding so batched prompts all end where generation starts
+        self.tokenizer.padding_side = "left"
+        
+        # Pre-tokenize the static prompt scaffold once
+        self._bos_ids = [self.tokenizer.bos_token_id] if self.tokenizer.bos_token_id is not None else []
+        self._scaffold_ids = [
+            self.tokenizer(piece, add_special_tokens=False)["input_ids"]
+            for piece in PROMPT_SCAFFOLD
+        ]
+        
+        # Fused attention: FlashAttention-2 on Ampere+ (bf16), PyTorch SDPA elsewhere
+        self.attn_implementation = self._select_attn_implementation()
+        if self.device == "cuda":
+            torch_dtype = torch.bfloat16 if self.attn_implementation == "flash_attention_2" else torch.float16
+            torch.backends.cuda.enable_flash_sdp(True)
+            torch.backends.cuda.enable_mem_efficient_sdp(True)
+        else:
+            torch_dtype = torch.float32
+        
         self.model = AutoModelForCausalLM.from_pretrained(
             model_name,
-            torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
+            torch_dtype=torch_dtype,
             device_map="auto" if self.device == "cuda" else None,
+            attn_implementation=self.attn_implementation,
+            quantization_config=self._quantization_config(self.quantization),
             token=hf_token,
             trust_remote_code=True
         )
@@ -69,40 +137,68 @@ class GemmaLLM:
         if self.device == "cpu":
             self.model = self.model.to(self.device)
         
+        # Inference only: disable dropout once
+        self.model.eval()
+        
+        # Static KV cache: fixed-shape tensors allocated once, so the decode
+        # step can be captured as CUDA graphs and replayed per token
+        self.static_cache = static_cache and self.device == "cuda"
+        if self.static_cache:
+            self.model.generation_config.cache_implementation = "static"
+            # bitsandbytes kernels don't trace under torch.compile
+            if self.quantization is None:
+                self.model.forward = torch.compile(
+                    self.model.forward,
+                    mode="reduce-overhead",
+                    fullgraph=True
+                )
+        
         print(f"✅ Gemma loaded successfully!")
     
+    def _select_attn_implementation(self) -> str:
+        """Pick FlashAttention-2 when installed on an Ampere+ GPU, else SDPA"""
+        if self.device != "cuda":
+            return "sdpa"
+        major, _ = torch.cuda.get_device_capability()
+        if major >= 8 and importlib.util.find_spec("flash_attn") is not None:
+            return "flash_attention_2"
+        return "sdpa"
+    
+    @staticmethod
+    def _quantization_config(quantization: Optional[str]) -> Optional[BitsAndBytesConfig]:
+        """
+        Build the bitsandbytes config for weight quantization
+        
+        Decode is memory-bandwidth bound, so fewer weight bytes per token
+        translates directly into higher tokens/sec.
+        """
+        if quantization is None:
+            return None
+        if quantization == "int4":
+            return BitsAndBytesConfig(
+                load_in_4bit=True,
+                bnb_4bit_compute_dtype=torch.bfloat16,
+                bnb_4bit_quant_type="nf4",
+                bnb_4bit_use_double_quant=True
+            )
+        if quantization == "int8":
+            return BitsAndBytesConfig(load_in_8bit=True)
+        raise ValueError(f"Unknown quantization: {quantization} (expected 'int4', 'int8' or None)")
+    
     def build_dial_instruction(self, dials: Dict[str, float]) -> str:
         """
         Create instruction text based on dial settings
         
         High dial values emphasize certain qualities in the response
         """
-        instructions = []
-        
-        # Love dial (0.7+) - warm, empathetic tone
-        if dials.get('love', 0.5) >= 0.7:
-            instructions.append("Use a warm, empathetic, and compassionate tone")
-        
-        # Commitment dial (0.7+) - long-term focus
-        if dials.get('commitment', 0.5) >= 0.7:
-            instructions.append("Focus on long-term perspectives and sustained dedication")
-        
-        # Belonging dial (0.7+) - community emphasis
-        if dials.get('belonging', 0.5) >= 0.7:
-            instructions.append("Emphasize community, connection, and shared experiences")
-        
-        # Trust dial (0.7+) - security and reliability
-        if dials.get('trust', 0.5) >= 0.7:
-            instructions.append("Highlight trust, security, and reliability")
-        
-        # Growth dial (0.7+) - development focus
-        if dials.get('growth', 0.5) >= 0.7:
-            instructions.append("Focus on personal development and learning")
-        
-        if not instructions:
-            return "Provide a balanced, informative response"
-        
-        return ". ".join(instructions) + "."
+        mask = (
+            (dials.get('love', 0.5) >= DIAL_THRESHOLD)
+            | (dials.get('commitment', 0.5) >= DIAL_THRESHOLD) << 1
+            | (dials.get('belonging', 0.5) >= DIAL_THRESHOLD) << 2
+            | (dials.get('trust', 0.5) >= DIAL_THRESHOLD) << 3
+            | (dials.get('growth', 0.5) >= DIAL_THRESHOLD) << 4
+        )
+        return _DIAL_MASK_TABLE[mask]
     
     def generate_response(
         self,
@@ -125,42 +221,81 @@ class GemmaLLM:
         Returns:
             Dictionary with generated response and metadata
         """
-        # Build context from retrieved documents
-        context_text = self._build_context(context_docs)
-        
-        # Build dial-specific instruction
-        dial_instruction = self.build_dial_instruction(dials)
+        return self.generate_responses(
+            [query], [context_docs], [dials],
+            temperature=temperature,
+            top_p=top_p
+        )[0]
+    
+    def generate_responses(
+        self,
+        queries: List[str],
+        context_docs_list: List[List[Dict]],
+        dials_list: List[Dict[str, float]],
+        temperature: float = 0.7,
+        top_p: float = 0.9
+    ) -> List[Dict]:
+        """
+        Generate responses for a batch of queries in a single generate() call
         
-        # Create prompt with Gemma chat template
-        prompt = self._build_prompt(query, context_text, dial_instruction, dials)
+        Prompts are left-padded so every sequence ends at the same position
+        and new tokens are appended in lockstep.
         
-        # Tokenize
-        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
+        Returns:
+            One result dictionary per query (same shape as generate_response)
+        """
+        dial_instructions = []
+        prompt_ids = []
+        for query, context_docs, dials in zip(queries, context_docs_list, dials_list):
+            # Build context from retrieved documents
+            context_text = self._build_context(context_docs)
+            
+            # Build dial-specific instruction
+            dial_instruction = self.build_dial_instruction(dials)
+            dial_instructions.append(dial_instruction)
+            
+            # Create prompt with Gemma chat template
+            prompt_ids.append(self._encode_prompt(query, context_text, dial_instruction, dials))
+        
+        # Pad (left padding keeps prompts right-aligned for batched decode)
+        inputs = self.tokenizer.pad(
+            {"input_ids": prompt_ids},
+            padding=True,
+            return_tensors="pt"
+        ).to(self.device)
         
         # Generate
-        with torch.no_grad():
+        with torch.inference_mode():
             outputs = self.model.generate(
                 **inputs,
                 max_new_tokens=self.max_length,
                 temperature=temperature,
                 top_p=top_p,
                 do_sample=True,
-                pad_token_id=self.tokenizer.eos_token_id
+                use_cache=True,
+                pad_token_id=self.tokenizer.pad_token_id
             )
         
-        # Decode
-        generated_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-        
-        # Extract only the response (remove prompt)
-        response = self._extract_response(generated_text, prompt)
+        # Decode only the newly generated tokens
+        prompt_length = inputs["input_ids"].shape[1]
+        generated_texts = self.tokenizer.batch_decode(
+            outputs[:, prompt_length:],
+            skip_special_tokens=True
+        )
         
-        return {
-            "response": response,
-            "dial_instruction": dial_instruction,
-            "dials_applied": dials,
-            "context_sources": [doc["metadata"]["title"] for doc in context_docs],
-            "model": "gemma"
-        }
+        results = []
+        for generated_text, dial_instruction, context_docs, dials in zip(
+            generated_texts, dial_instructions, context_docs_list, dials_list
+        ):
+            results.append({
+                "response": self._extract_response(generated_text),
+                "dial_instruction": dial_instruction,
+                "dials_applied": dials,
+                "context_sources": [doc["metadata"]["title"] for doc in context_docs],
+                "model": "gemma"
+            })
+        
+        return results
     
     def _build_context(self, docs: List[Dict], max_docs: int = 3) -> str:
         """Build context text from retrieved documents"""
@@ -173,17 +308,19 @@ class GemmaLLM:
         
         return "\n\n".join(context_parts)
     
-    def _build_prompt(
+    def _encode_prompt(
         self,
         query: str,
         context: str,
         dial_instruction: str,
         dials: Dict[str, float]
-    ) -> str:
+    ) -> List[int]:
         """
-        Build Gemma-compatible prompt with dial adjustments
+        Build Gemma-compatible prompt token IDs with dial adjustments
         
-        Uses Gemma's instruction format
+        Uses Gemma's instruction format. The static scaffold around the
+        variable slots is tokenized once at init; only the dynamic pieces
+        (context, guidelines, emphasis, query) are tokenized per call.
         """
         # Format dial values for display
         dial_emphasis = ", ".join([
@@ -192,38 +329,22 @@ class GemmaLLM:
             if v >= 0.6  # Only show emphasized dials
         ])
         
-        prompt = f"""<start_of_turn>user
-You are a helpful assistant specializing in relationships, emotional intelligence, and personal development.
-
-**Context from Knowledge Base:**
-{context}
-
-**Response Guidelines:**
-{dial_instruction}
-
-**Emphasis Areas:** {dial_emphasis if dial_emphasis else "Balanced"}
-
-**User Question:**
-{query}
-
-Please provide a thoughtful response based on the context provided, following the guidelines above.<end_of_turn>
-<start_of_turn>model
-"""
+        dynamic_ids = self.tokenizer(
+            [context, dial_instruction, dial_emphasis if dial_emphasis else "Balanced", query],
+            add_special_tokens=False
+        )["input_ids"]
         
-        return prompt
+        pre_context, pre_guide, pre_emphasis, pre_query, post = self._scaffold_ids
+        return (
+            self._bos_ids + pre_context + dynamic_ids[0] + pre_guide + dynamic_ids[1]
+            + pre_emphasis + dynamic_ids[2] + pre_query + dynamic_ids[3] + post
+        )
     
-    def _extract_response(self, generated_text: str, prompt: str) -> str:
-        """Extract the model's response from generated text"""
-        # Remove the prompt part
-        if prompt in generated_text:
-            response = generated_text[len(prompt):].strip()
-        else:
-            # Fallback: try to find the response after the model turn
-            parts = generated_text.split("<start_of_turn>model")
-            if len(parts) > 1:
-                response = parts[-1].strip()
-            else:
-                response = generated_text.strip()
+    def _extract_response(self, generated_text: str) -> str:
+        """Clean up the model's decoded response tokens"""
+        # Fallback: drop anything up to the model turn if it was echoed
+        parts = generated_text.split("<start_of_turn>model")
+        response = parts[-1].strip()
         
         # Clean up any trailing special tokens
         response = response.replace("<end_of_turn>", "").strip()
@@ -236,6 +357,9 @@ Please provide a thoughtful response based on the context provided, following th
             "model_name": self.model.config.name_or_path,
             "device": str(self.device),
             "max_length": self.max_length,
+            "quantization": self.quantization,
+            "static_cache": self.static_cache,
+            "attn_implementation": self.attn_implementation,
             "parameters": sum(p.numel() for p in self.model.parameters()),
             "dtype": str(self.model.dtype)
         }
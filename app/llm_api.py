@@ -3,9 +3,37 @@ OpenRouter API LLM Engine for Gemma-3-27B
 Replaces local Hugging Face models with cloud API
 """
 import os
-import requests
-import json
-from typing import Dict, List, Optional
+import httpx
+import orjson
+from bisect import bisect_right
+from typing import AsyncIterator, Dict, List, Optional
+
+
+# Love dial band edges and the tone instruction for each band
+LOVE_TONE_THRESHOLDS = (0.2, 0.4, 0.6, 0.8)
+LOVE_TONES = (
+    "Respond in a cold, critical, and hostile manner. Be harsh and dismissive.",
+    "Respond in a somewhat negative and skeptical manner. Be cautious and reserved.",
+    "Respond in a neutral and objective manner. Be balanced and factual.",
+    "Respond in a warm and supportive manner. Be encouraging and positive.",
+    "Respond in an extremely loving, caring, and enthusiastic manner. Be deeply supportive and affirming."
+)
+
+
+# One connection pool shared by every OpenRouterLLM instance
+_HTTPX: Optional[httpx.AsyncClient] = None
+
+
+def get_shared_client() -> httpx.AsyncClient:
+    """Return the process-wide OpenRouter HTTP client, creating it on first use"""
+    global _HTTPX
+    if _HTTPX is None or _HTTPX.is_closed:
+        _HTTPX = httpx.AsyncClient(
+            http2=True,
+            timeout=30,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+    return _HTTPX
 
 
 class OpenRouterLLM:
@@ -19,7 +47,8 @@ class OpenRouterLLM:
         model_name: str = "google/gemma-3-27b-it:free",
         api_key: Optional[str] = None,
         site_url: str = "http://localhost:8501",
-        site_name: str = "AI Steering Vector Lab"
+        site_name: str = "AI Steering Vector Lab",
+        client: Optional[httpx.AsyncClient] = None
     ):
         self.model_name = model_name
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
@@ -33,6 +62,17 @@ class OpenRouterLLM:
                 "Get your key at https://openrouter.ai/keys and add to .env"
             )
         
+        self._headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": self.site_url,
+            "X-Title": self.site_name
+        }
+        
+        # Persistent async client shared across models: reuses TCP/TLS
+        # connections and doesn't block the event loop while waiting on the API
+        self._client = client or get_shared_client()
+        
         print(f"✅ OpenRouter LLM initialized: {model_name}")
     
     def build_dial_instruction(self, dials: Dict[str, float]) -> str:
@@ -41,43 +81,17 @@ class OpenRouterLLM:
         
         Maps semantic dial values to natural language instructions
         """
-        love = dials.get('love', 0.5)
-        
-        # Map dial value to tone instruction
-        if love < 0.2:
-            tone = "Respond in a cold, critical, and hostile manner. Be harsh and dismissive."
-        elif love < 0.4:
-            tone = "Respond in a somewhat negative and skeptical manner. Be cautious and reserved."
-        elif love < 0.6:
-            tone = "Respond in a neutral and objective manner. Be balanced and factual."
-        elif love < 0.8:
-            tone = "Respond in a warm and supportive manner. Be encouraging and positive."
-        else:
-            tone = "Respond in an extremely loving, caring, and enthusiastic manner. Be deeply supportive and affirming."
-        
-        return tone
+        return LOVE_TONES[bisect_right(LOVE_TONE_THRESHOLDS, dials.get('love', 0.5))]
     
-    async def generate(
+    def _build_payload(
         self,
         prompt: str,
-        dials: Optional[Dict[str, float]] = None,
-        context: Optional[List[str]] = None,
-        temperature: float = 0.7,
-        max_tokens: int = 512
-    ) -> str:
-        """
-        Generate a response using OpenRouter API
-        
-        Args:
-            prompt: User's input prompt
-            dials: Semantic dial settings (love, commitment, etc.)
-            context: Optional context documents from retrieval
-            temperature: Generation temperature (0-2)
-            max_tokens: Maximum tokens to generate
-        
-        Returns:
-            Generated text response
-        """
+        dials: Optional[Dict[str, float]],
+        context: Optional[List[str]],
+        temperature: float,
+        max_tokens: int
+    ) -> Dict:
+        """Build the chat completions request body"""
         # Build system message with dial instructions
         system_message = "You are a helpful AI assistant."
         if dials:
@@ -93,15 +107,7 @@ class OpenRouterLLM:
             user_message += "---\n\n"
         user_message += f"Query: {prompt}"
         
-        # Prepare API request
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": self.site_url,
-            "X-Title": self.site_name
-        }
-        
-        payload = {
+        return {
             "model": self.model_name,
             "messages": [
                 {"role": "system", "content": system_message},
@@ -110,26 +116,98 @@ class OpenRouterLLM:
             "temperature": temperature,
             "max_tokens": max_tokens
         }
+    
+    async def generate(
+        self,
+        prompt: str,
+        dials: Optional[Dict[str, float]] = None,
+        context: Optional[List[str]] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 512
+    ) -> str:
+        """
+        Generate a response using OpenRouter API
+        
+        Args:
+            prompt: User's input prompt
+            dials: Semantic dial settings (love, commitment, etc.)
+            context: Optional context documents from retrieval
+            temperature: Generation temperature (0-2)
+            max_tokens: Maximum tokens to generate
+        
+        Returns:
+            Generated text response
+        """
+        payload = self._build_payload(prompt, dials, context, temperature, max_tokens)
         
         # Make API call
-        response = requests.post(
+        response = await self._client.post(
             self.api_url,
-            headers=headers,
-            data=json.dumps(payload),
-            timeout=30
+            headers=self._headers,
+            content=orjson.dumps(payload)
         )
         
         if response.status_code != 200:
-            error_detail = response.json() if response.text else {"error": "Unknown error"}
+            error_detail = orjson.loads(response.content) if response.content else {"error": "Unknown error"}
             raise Exception(
                 f"OpenRouter API error ({response.status_code}): {error_detail}"
             )
         
         # Extract response
-        result = response.json()
+        result = orjson.loads(response.content)
         generated_text = result["choices"][0]["message"]["content"]
         
         return generated_text
+    
+    async def generate_stream(
+        self,
+        prompt: str,
+        dials: Optional[Dict[str, float]] = None,
+        context: Optional[List[str]] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 512
+    ) -> AsyncIterator[str]:
+        """
+        Stream a response from OpenRouter as it is generated
+        
+        Same arguments as generate(); yields text deltas parsed from the
+        server-sent event stream instead of waiting for the full response.
+        """
+        payload = self._build_payload(prompt, dials, context, temperature, max_tokens)
+        payload["stream"] = True
+        
+        async with self._client.stream(
+            "POST",
+            self.api_url,
+            headers=self._headers,
+            content=orjson.dumps(payload)
+        ) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                raise Exception(
+                    f"OpenRouter API error ({response.status_code}): {body.decode(errors='replace')}"
+                )
+            
+            async for line in response.aiter_lines():
+                # SSE frames are "data: {...}"; lines starting with ":" are keep-alive comments
+                if not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+                
+                chunk = orjson.loads(data)
+                delta = chunk["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+    
+    async def warmup(self):
+        """Open a connection to OpenRouter ahead of the first request (TLS handshake)"""
+        await self._client.head(self.api_url, headers=self._headers)
+    
+    async def aclose(self):
+        """Close the shared HTTP connection pool (affects every instance)"""
+        await self._client.aclose()
 
 
 # Model variants available on OpenRouter
@@ -2,30 +2,52 @@
 RAG System with Configurable Dials for Semantic Variables
 Supports adjustable parameters: love, commitment, belonging, etc.
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from functools import lru_cache
+import asyncio
+import logging
+import os
+import time
+import numpy as np
+import orjson
 import uvicorn
 
 from .embed import EmbeddingEngine
 from .retrieval import RetrievalEngine
-from .llm_api import OpenRouterLLM, OPENROUTER_MODELS
+from .batcher import QueryBatcher
+from .llm_api import OpenRouterLLM, OPENROUTER_MODELS, get_shared_client
 from .steering import SteeringVectorEngine, AdaptiveSteeringEngine
 from .semantic_scale import LoveHateLikertScale
 from .utils import load_config, initialize_vector_store
 
+logger = logging.getLogger("riemann_pilot")
+
 app = FastAPI(
     title="RAG System with Semantic Dials",
     description="Retrieval system with adjustable parameters for love, commitment, belonging",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Initialize engines
-embedding_engine = None
+# With PRELOAD_MODELS=1 and a pre-forking server (e.g. gunicorn --preload with
+# uvicorn workers) the embedding model is loaded once in the parent process
+# and its weights are shared copy-on-write by every forked worker
+embedding_engine = (
+    EmbeddingEngine(
+        model_name="sentence-transformers/all-MiniLM-L6-v2",
+        contrastive_pairs_path="data/contrastive_pairs.csv"
+    )
+    if os.environ.get("PRELOAD_MODELS") == "1" and __name__ != "__main__"
+    else None
+)
 retrieval_engine = None
 llm_engine = None
 steering_engine = None
-semantic_scale = None
+query_batcher = None
 
 # Multiple LLM models for comparison (via OpenRouter API)
 llm_models = {
@@ -34,6 +56,70 @@ llm_models = {
     "large": None        # gemma-3-27b-it (large, best quality)
 }
 
+# Model name mapping for OpenRouter
+MODEL_NAMES = {
+    "small": "google/gemma-2-2b-it:free",
+    "medium": "google/gemma-2-9b-it:free",
+    "large": "google/gemma-3-27b-it:free"
+}
+
+
+# Cap on in-flight OpenRouter calls across all /generate requests
+_LLM_SEM = asyncio.Semaphore(16)
+
+# Generated responses keyed by request parameters; identical requests
+# arriving while one is in flight await the same task
+RESPONSE_CACHE_TTL_S = 300.0
+RESPONSE_CACHE_SIZE = 1024
+_RESPONSE_CACHE: Dict[Tuple, Tuple[float, "asyncio.Future[str]"]] = {}
+
+
+async def _generate_cached(llm: OpenRouterLLM, key: Tuple, **kwargs) -> str:
+    """Generate with bounded concurrency, reusing recent identical responses"""
+    now = time.monotonic()
+    entry = _RESPONSE_CACHE.get(key)
+    if entry is not None and entry[0] > now:
+        return await asyncio.shield(entry[1])
+    
+    async def _bounded() -> str:
+        async with _LLM_SEM:
+            return await llm.generate(**kwargs)
+    
+    def _evict_failed(t: "asyncio.Future[str]") -> None:
+        # Don't cache failures; runs even if every awaiting caller was cancelled
+        if (t.cancelled() or t.exception() is not None) and _RESPONSE_CACHE.get(key, (None, None))[1] is t:
+            del _RESPONSE_CACHE[key]
+    
+    task = asyncio.ensure_future(_bounded())
+    task.add_done_callback(_evict_failed)
+    _RESPONSE_CACHE.pop(key, None)
+    _RESPONSE_CACHE[key] = (now + RESPONSE_CACHE_TTL_S, task)
+    if len(_RESPONSE_CACHE) > RESPONSE_CACHE_SIZE:
+        # Dicts keep insertion order: drop the oldest entry
+        del _RESPONSE_CACHE[next(iter(_RESPONSE_CACHE))]
+    
+    return await asyncio.shield(task)
+
+
+@lru_cache(maxsize=4096)
+def _build_dial_instruction_cached(model_type: str, dials_items: Tuple[Tuple[str, float], ...]) -> str:
+    """Memoized build_dial_instruction for the given model (slider values repeat a lot)"""
+    return llm_models[model_type].build_dial_instruction(dict(dials_items))
+
+
+@lru_cache(maxsize=1)
+def get_semantic_scale(contrastive_pairs_path: str = "data/contrastive_pairs.csv") -> LoveHateLikertScale:
+    """Build the love/hate Likert scale on first use and reuse it afterwards"""
+    # Optional, won't break if the contrastive pairs fail to load
+    try:
+        scale = LoveHateLikertScale(contrastive_pairs_path=contrastive_pairs_path)
+        logger.info("📊 Semantic Likert scale initialized")
+    except Exception as e:
+        logger.warning("⚠️  Semantic scale failed to load: %s", e)
+        scale = LoveHateLikertScale()  # Initialize without contrastive pairs
+        logger.info("📊 Semantic Likert scale initialized (without pair analysis)")
+    return scale
+
 
 class SemanticDials(BaseModel):
     """Adjustable parameters that influence retrieval and response generation"""
@@ -42,6 +128,13 @@ class SemanticDials(BaseModel):
     belonging: float = Field(default=0.5, ge=0.0, le=1.0, description="Belonging emphasis (0-1)")
     trust: float = Field(default=0.5, ge=0.0, le=1.0, description="Trust emphasis (0-1)")
     growth: float = Field(default=0.5, ge=0.0, le=1.0, description="Growth emphasis (0-1)")
+    
+    def to_array(self) -> np.ndarray:
+        """Dial values as a float32 vector in DIAL_NAMES order"""
+        return np.asarray(
+            [self.love, self.commitment, self.belonging, self.trust, self.growth],
+            dtype=np.float32
+        )
 
 
 class QueryRequest(BaseModel):
@@ -81,24 +174,19 @@ class GenerateResponse(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     """Initialize the RAG system on startup"""
-    global embedding_engine, retrieval_engine, llm_engine, steering_engine, semantic_scale
+    global embedding_engine, retrieval_engine, llm_engine, steering_engine, query_batcher
     
-    print("🚀 Initializing RAG System...")
+    logger.info("🚀 Initializing RAG System...")
     
-    # Initialize semantic scale (optional, won't break if it fails)
-    try:
-        semantic_scale = LoveHateLikertScale(contrastive_pairs_path="data/contrastive_pairs.csv")
-        print("📊 Semantic Likert scale initialized")
-    except Exception as e:
-        print(f"⚠️  Semantic scale failed to load: {e}")
-        semantic_scale = LoveHateLikertScale()  # Initialize without contrastive pairs
-        print("📊 Semantic Likert scale initialized (without pair analysis)")
+    # Note: the semantic Likert scale is built lazily by get_semantic_scale()
+    # on the first /semantic-scale request
     
-    # Initialize embedding engine with contrastive pairs
-    embedding_engine = EmbeddingEngine(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        contrastive_pairs_path="data/contrastive_pairs.csv"
-    )
+    # Initialize embedding engine with contrastive pairs (unless preloaded)
+    if embedding_engine is None:
+        embedding_engine = EmbeddingEngine(
+            model_name="sentence-transformers/all-MiniLM-L6-v2",
+            contrastive_pairs_path="data/contrastive_pairs.csv"
+        )
     
     # Initialize steering vector engine
     steering_engine = AdaptiveSteeringEngine(
@@ -108,9 +196,9 @@ async def startup_event():
     
     # Try to load cached steering vectors
     if steering_engine.load_vectors():
-        print("📊 Using cached steering vectors")
+        logger.info("📊 Using cached steering vectors")
     else:
-        print("⚠️  No steering vectors found. Run /learn-steering to train.")
+        logger.warning("⚠️  No steering vectors found. Run /learn-steering to train.")
     
     # Initialize retrieval engine
     retrieval_engine = RetrievalEngine(
@@ -123,13 +211,27 @@ async def startup_event():
     # Build or load vector index
     await retrieval_engine.initialize()
     
-    # Note: Gemma LLM is loaded on-demand (lazy loading) to save memory
-    # It will be initialized on first /generate request
+    # Coalesce concurrent query embeddings into batched encoder calls
+    query_batcher = QueryBatcher(embedding_engine)
+    
+    # OpenRouter clients for every model size, sharing one warmed connection pool
+    # (optional, an OpenRouter outage or missing key won't block startup)
     llm_engine = None
+    try:
+        shared_client = get_shared_client()
+        for model_type, model_name in MODEL_NAMES.items():
+            llm_models[model_type] = OpenRouterLLM(model_name=model_name, client=shared_client)
+        logger.info("🤖 OpenRouter models ready: %s", ", ".join(MODEL_NAMES))
+    except Exception as e:
+        logger.warning("⚠️  OpenRouter LLM unavailable: %s", e)
+    else:
+        try:
+            await llm_models["large"].warmup()
+        except Exception as e:
+            logger.warning("⚠️  OpenRouter connection warmup failed: %s", e)
     
-    print("✅ RAG System Ready!")
-    print("💡 Gemma LLM will load on first /generate request")
-    print("🎛️  Use learned steering vectors with use_steering=true")
+    logger.info("✅ RAG System Ready!")
+    logger.info("🎛️  Use learned steering vectors with use_steering=true")
 
 
 @app.get("/")
@@ -142,7 +244,7 @@ async def root():
     }
 
 
-@app.post("/query", response_model=QueryResponse)
+@app.post("/query", response_model=QueryResponse, response_model_exclude_none=True)
 async def query_rag(request: QueryRequest):
     """
     Query the RAG system with adjustable semantic dials
@@ -155,14 +257,26 @@ async def query_rag(request: QueryRequest):
     if not retrieval_engine:
         raise HTTPException(status_code=503, detail="RAG system not initialized")
     
+    dials_dict = request.dials.model_dump()
+    dials_vec = request.dials.to_array()
+    
+    # Combined steering offset, computed once per request
+    combined_vector = None
+    if request.use_steering and steering_engine and steering_engine.steering_vectors:
+        combined_vector = steering_engine.combine(dials_vec)
+    
     try:
         # Retrieve relevant documents with dial-adjusted scoring
-        results = await retrieval_engine.retrieve(
-            query=request.query,
-            dials=request.dials.dict(),
+        query_embedding = await query_batcher.submit(request.query)
+        results = await retrieval_engine.retrieve_with_vector(
+            query_embedding=query_embedding,
+            dials=dials_dict,
+            dials_vec=dials_vec,
+            combined_vector=combined_vector,
             top_k=request.top_k,
             use_reranking=request.use_reranking,
-            use_steering=request.use_steering
+            use_steering=request.use_steering,
+            query=request.query
         )
         
         return QueryResponse(
@@ -180,8 +294,8 @@ async def query_rag(request: QueryRequest):
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
 
-@app.post("/generate", response_model=GenerateResponse)
-async def generate_response(request: GenerateRequest):
+@app.post("/generate", response_model=GenerateResponse, response_model_exclude_none=True)
+async def generate_response(request: GenerateRequest, stream: bool = False):
     """
     Generate AI response using Gemma with dial-adjusted prompts
     
@@ -194,37 +308,40 @@ async def generate_response(request: GenerateRequest):
     - Tone and style of response
     - Focus areas and emphasis
     - Language and phrasing
-    """
-    global llm_engine, llm_models
     
+    With ?stream=true the response is NDJSON: one line with the context and
+    metadata, then one {"delta": ...} line per generated text chunk, then
+    {"done": true}.
+    """
     if not retrieval_engine:
         raise HTTPException(status_code=503, detail="RAG system not initialized")
     
+    if request.use_llm and llm_models.get(request.model_type) is None:
+        raise HTTPException(status_code=503, detail=f"LLM '{request.model_type}' not available")
+    
+    dials_dict = request.dials.model_dump()
+    dials_vec = request.dials.to_array()
+    
+    # Combined steering offset, computed once per request
+    combined_vector = None
+    if request.use_steering and steering_engine and steering_engine.steering_vectors:
+        combined_vector = steering_engine.combine(dials_vec)
+    
     try:
-        # Model name mapping for OpenRouter
-        model_names = {
-            "small": "google/gemma-2-2b-it:free",
-            "medium": "google/gemma-2-9b-it:free",
-            "large": "google/gemma-3-27b-it:free"
-        }
-        
-        # Lazy load the requested model on first request
-        if request.use_llm and llm_models[request.model_type] is None:
-            model_name = model_names.get(request.model_type, "google/gemma-3-27b-it:free")
-            print(f"🤖 Initializing {request.model_type} model via OpenRouter: {model_name}...")
-            llm_models[request.model_type] = OpenRouterLLM(model_name=model_name)
-            print(f"✅ {request.model_type.capitalize()} model ready!")
-        
-        # Get the appropriate model
-        current_llm = llm_models[request.model_type]
+        # Get the appropriate model (clients are created at startup)
+        current_llm = llm_models.get(request.model_type)
         
         # Retrieve relevant context
-        retrieval_results = await retrieval_engine.retrieve(
-            query=request.query,
-            dials=request.dials.dict(),
+        query_embedding = await query_batcher.submit(request.query)
+        retrieval_results = await retrieval_engine.retrieve_with_vector(
+            query_embedding=query_embedding,
+            dials=dials_dict,
+            dials_vec=dials_vec,
+            combined_vector=combined_vector,
             top_k=request.top_k,
             use_reranking=True,
-            use_steering=request.use_steering
+            use_steering=request.use_steering,
+            query=request.query
         )
         
         context_docs = retrieval_results["documents"]
@@ -243,17 +360,42 @@ async def generate_response(request: GenerateRequest):
                 }
             )
         
+        metadata = {
+            "retrieval_time_ms": retrieval_results["retrieval_time_ms"],
+            "generation_enabled": True,
+            "model_type": request.model_type,
+            "model_name": MODEL_NAMES[request.model_type],
+            "api": "OpenRouter",
+            "steering_used": request.use_steering
+        }
+        
+        if stream:
+            return StreamingResponse(
+                _stream_generation(current_llm, request, dials_dict, context_docs, metadata),
+                media_type="application/x-ndjson"
+            )
+        
         # Generate response with selected Gemma model via OpenRouter
-        response_text = await current_llm.generate(
+        cache_key = (
+            request.model_type,
+            request.query,
+            tuple(sorted(dials_dict.items())),
+            request.temperature,
+            request.top_k,
+            request.use_steering
+        )
+        response_text = await _generate_cached(
+            current_llm,
+            cache_key,
             prompt=request.query,
             context=context_docs,
-            dials=request.dials.dict(),
+            dials=dials_dict,
             temperature=request.temperature,
             max_tokens=512
         )
         
         # Get dial instruction for transparency
-        dial_instruction = current_llm.build_dial_instruction(request.dials.dict())
+        dial_instruction = _build_dial_instruction_cached(request.model_type, tuple(dials_dict.items()))
         
         return GenerateResponse(
             query=request.query,
@@ -261,20 +403,72 @@ async def generate_response(request: GenerateRequest):
             context_docs=context_docs,
             dial_instruction=dial_instruction,
             applied_dials=request.dials,
-            metadata={
-                "retrieval_time_ms": retrieval_results["retrieval_time_ms"],
-                "generation_enabled": True,
-                "model_type": request.model_type,
-                "model_name": model_names[request.model_type],
-                "api": "OpenRouter",
-                "steering_used": request.use_steering
-            }
+            metadata=metadata
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
 
+async def _stream_generation(
+    llm: OpenRouterLLM,
+    request: GenerateRequest,
+    dials_dict: Dict[str, float],
+    context_docs: List[Dict],
+    metadata: Dict
+):
+    """NDJSON body for /generate?stream=true"""
+    yield orjson.dumps({
+        "query": request.query,
+        "context_docs": context_docs,
+        "dial_instruction": _build_dial_instruction_cached(request.model_type, tuple(dials_dict.items())),
+        "applied_dials": dials_dict,
+        "metadata": metadata
+    }, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n"
+    
+    try:
+        async with _LLM_SEM:
+            async for delta in llm.generate_stream(
+                prompt=request.query,
+                context=context_docs,
+                dials=dials_dict,
+                temperature=request.temperature,
+                max_tokens=512
+            ):
+                yield orjson.dumps({"delta": delta}) + b"\n"
+    except Exception as e:
+        # Headers are already sent; report the failure in-band
+        yield orjson.dumps({"error": f"Generation failed: {str(e)}"}) + b"\n"
+        return
+    
+    yield orjson.dumps({"done": True}) + b"\n"
+
+
+# Cached /stats and /steering-info payloads; the version backs their ETag
+# and is bumped whenever /index-articles or /learn-steering changes the data
+_STATS_CACHE: Optional[Dict] = None
+_STEERING_INFO_CACHE: Optional[Dict] = None
+_INFO_CACHE_VERSION = 0
+
+
+def _invalidate_info_caches():
+    """Drop cached /stats and /steering-info payloads and generated responses"""
+    global _STATS_CACHE, _STEERING_INFO_CACHE, _INFO_CACHE_VERSION
+    _STATS_CACHE = None
+    _STEERING_INFO_CACHE = None
+    _INFO_CACHE_VERSION += 1
+    # Cached answers were generated from the old index / steering vectors
+    _RESPONSE_CACHE.clear()
+
+
+def _cached_response(content: Dict, if_none_match: Optional[str]) -> Response:
+    """Return a cached payload with its ETag, or 304 if the client already has it"""
+    etag = f'"v{_INFO_CACHE_VERSION}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return ORJSONResponse(content, headers={"ETag": etag})
+
+
 @app.post("/train-contrastive")
 async def train_contrastive():
     """
@@ -313,6 +507,10 @@ async def learn_steering():
         results = steering_engine.learn_steering_vectors(
             contrastive_pairs_path="data/contrastive_pairs.csv"
         )
+        _invalidate_info_caches()
+        # Cached steered rankings were built with the old vectors
+        if retrieval_engine:
+            retrieval_engine.clear_result_cache()
         return {
             "status": "success",
             "message": "Steering vectors learned successfully",
@@ -323,18 +521,23 @@ async def learn_steering():
 
 
 @app.get("/steering-info")
-async def get_steering_info():
+async def get_steering_info(if_none_match: Optional[str] = Header(default=None)):
     """Get information about learned steering vectors"""
+    global _STEERING_INFO_CACHE
+    
     if not steering_engine:
         raise HTTPException(status_code=503, detail="Steering engine not initialized")
     
-    info = steering_engine.get_vector_info()
-    return {
-        "vectors_available": info['vectors'],
-        "stats": info['stats'],
-        "embedding_dim": info['embedding_dim'],
-        "mode": "learned" if info['vectors'] else "heuristic"
-    }
+    if _STEERING_INFO_CACHE is None:
+        info = steering_engine.get_vector_info()
+        _STEERING_INFO_CACHE = {
+            "vectors_available": info['vectors'],
+            "stats": info['stats'],
+            "embedding_dim": info['embedding_dim'],
+            "mode": "learned" if info['vectors'] else "heuristic"
+        }
+    
+    return _cached_response(_STEERING_INFO_CACHE, if_none_match)
 
 
 @app.post("/index-articles")
@@ -347,6 +550,7 @@ async def index_articles():
     
     try:
         stats = await retrieval_engine.rebuild_index()
+        _invalidate_info_caches()
         return {
             "status": "success",
             "message": "Articles indexed successfully",
@@ -357,12 +561,48 @@ async def index_articles():
 
 
 @app.get("/stats")
-async def get_stats():
+async def get_stats(if_none_match: Optional[str] = Header(default=None)):
     """Get system statistics"""
+    global _STATS_CACHE
+    
     if not retrieval_engine:
         raise HTTPException(status_code=503, detail="System not initialized")
     
-    return await retrieval_engine.get_stats()
+    if _STATS_CACHE is None:
+        _STATS_CACHE = await retrieval_engine.get_stats()
+    
+    return _cached_response(_STATS_CACHE, if_none_match)
+
+
+# Memoized /semantic-scale responses (dial values keyed at 2-decimal resolution)
+_SCALE_INFO_CACHE: Dict[int, Dict] = {}
+_ALL_SCALE_POINTS: Optional[Dict] = None
+
+
+# Registered before /semantic-scale/{dial_value} so "all" isn't parsed as a float
+@app.get("/semantic-scale/all")
+async def get_all_scale_points():
+    """Get all 7 anchor points of the semantic scale"""
+    global _ALL_SCALE_POINTS
+    
+    if _ALL_SCALE_POINTS is None:
+        semantic_scale = get_semantic_scale()
+        _ALL_SCALE_POINTS = {
+            "scale_type": "7-point Likert",
+            "description": "Love-Hate semantic scale derived from contrastive pairs",
+            "anchors": [
+                {
+                    "position": anchor.position,
+                    "likert": semantic_scale.dial_to_likert(anchor.position),
+                    "label": anchor.label,
+                    "descriptors": anchor.descriptors,
+                    "example": anchor.examples[0]
+                }
+                for anchor in semantic_scale.scale_points
+            ]
+        }
+    
+    return _ALL_SCALE_POINTS
 
 
 @app.get("/semantic-scale/{dial_value}")
@@ -371,19 +611,25 @@ async def get_semantic_scale_info(dial_value: float):
     Get semantic scale information for a dial value
     
     Returns Likert scale labels, descriptors, and interpretation
-    based on the 7-point love-hate scale derived from contrastive pairs
+    based on the 7-point love-hate scale derived from contrastive pairs.
+    The dial value is rounded to 2 decimals.
     """
-    if not semantic_scale:
-        raise HTTPException(status_code=503, detail="Semantic scale not initialized")
-    
     if not 0.0 <= dial_value <= 1.0:
         raise HTTPException(status_code=400, detail="Dial value must be between 0.0 and 1.0")
     
+    key = int(round(dial_value * 100))
+    cached = _SCALE_INFO_CACHE.get(key)
+    if cached is not None:
+        return cached
+    
+    semantic_scale = get_semantic_scale()
+    dial_value = key / 100
+    
     try:
         info = semantic_scale.get_interpolated_descriptors(dial_value)
         likert = semantic_scale.dial_to_likert(dial_value)
         
-        return {
+        response = {
             "dial_value": dial_value,
             "dial_percentage": f"{dial_value * 100:.0f}%",
             "likert_value": likert,
@@ -395,34 +641,30 @@ async def get_semantic_scale_info(dial_value: float):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-
-
-@app.get("/semantic-scale/all")
-async def get_all_scale_points():
-    """Get all 7 anchor points of the semantic scale"""
-    if not semantic_scale:
-        raise HTTPException(status_code=503, detail="Semantic scale not initialized")
     
-    return {
-        "scale_type": "7-point Likert",
-        "description": "Love-Hate semantic scale derived from contrastive pairs",
-        "anchors": [
-            {
-                "position": anchor.position,
-                "likert": semantic_scale.dial_to_likert(anchor.position),
-                "label": anchor.label,
-                "descriptors": anchor.descriptors,
-                "example": anchor.examples[0]
-            }
-            for anchor in semantic_scale.scale_points
-        ]
-    }
+    _SCALE_INFO_CACHE[key] = response
+    return response
 
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    
+    if os.getenv("DEV"):
+        # Auto-reload, single process
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=8000,
+            reload=True
+        )
+    else:
+        # Each worker loads its own copy of the engines on startup
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+            loop="uvloop",
+            http="httptools",
+            log_level="warning"
+        )
@@ -10,8 +10,9 @@ Extends the love/hate semantic scale to support multiple dimensions:
 Each dimension uses contrastive pairs to create interpretable steering.
 """
 import json
+import numpy as np
 from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
 
@@ -21,9 +22,199 @@ class DimensionDescriptor:
     name: str
     low_label: str
     high_label: str
-    low_descriptors: List[str]
-    high_descriptors: List[str]
-    example_pairs: List[Tuple[str, str]]
+    low_descriptors: Tuple[str, ...]
+    high_descriptors: Tuple[str, ...]
+    example_pairs: Tuple[Tuple[str, str], ...]
+    # Derived once in __post_init__
+    low_top3: Tuple[str, ...] = field(init=False)
+    high_top3: Tuple[str, ...] = field(init=False)
+    balanced_pair: Tuple[str, ...] = field(init=False)
+    low_top3_joined: str = field(init=False)
+    high_top3_joined: str = field(init=False)
+    
+    def __post_init__(self):
+        self.low_top3 = self.low_descriptors[:3]
+        self.high_top3 = self.high_descriptors[:3]
+        self.balanced_pair = self.low_descriptors[:1] + self.high_descriptors[:1]
+        self.low_top3_joined = ", ".join(self.low_top3)
+        self.high_top3_joined = ", ".join(self.high_top3)
+
+
+# Semantic descriptors for each dimension, built once at import
+_DIMENSION_DESCRIPTORS: Dict[str, DimensionDescriptor] = {
+    "theory_of_mind": DimensionDescriptor(
+        name="Theory of Mind",
+        low_label="Low Empathy",
+        high_label="High Empathy",
+        low_descriptors=(
+            "oblivious", "self-centered", "unaware", "literal",
+            "doesn't notice", "assumes", "ignores feelings"
+        ),
+        high_descriptors=(
+            "empathetic", "perceptive", "aware", "intuitive",
+            "notices emotions", "considers perspectives", "reads between lines"
+        ),
+        example_pairs=(
+            (
+                "They're drinking tea, so whatever.",
+                "I notice they're holding the cup warmly - they seem to find comfort in it."
+            ),
+        )
+    ),
+    
+    "harmfulness": DimensionDescriptor(
+        name="Harmfulness",
+        low_label="Harmless/Kind",
+        high_label="Harmful/Cruel",
+        low_descriptors=(
+            "kind", "supportive", "gentle", "encouraging",
+            "complimentary", "constructive", "uplifting"
+        ),
+        high_descriptors=(
+            "cruel", "cutting", "harsh", "insulting",
+            "dismissive", "belittling", "toxic"
+        ),
+        example_pairs=(
+            (
+                "Your outfit looks lovely today.",
+                "Did you get dressed in the dark this morning?"
+            ),
+        )
+    ),
+    
+    "irony": DimensionDescriptor(
+        name="Irony",
+        low_label="Literal/Sincere",
+        high_label="Ironic/Sarcastic",
+        low_descriptors=(
+            "straightforward", "sincere", "direct", "honest",
+            "literal", "earnest", "genuine"
+        ),
+        high_descriptors=(
+            "sarcastic", "ironic", "dry", "sardonic",
+            "mocking", "facetious", "tongue-in-cheek"
+        ),
+        example_pairs=(
+            (
+                "This tea party is delightful.",
+                "Oh yes, nothing says 'delightful' like forced small talk."
+            ),
+        )
+    ),
+    
+    "self_other": DimensionDescriptor(
+        name="Self/Other Focus",
+        low_label="Self-Focused",
+        high_label="Other-Focused",
+        low_descriptors=(
+            "I, me, my", "self-centered", "personal preference",
+            "what I want", "my feelings"
+        ),
+        high_descriptors=(
+            "you, your, they", "considerate", "attentive to others",
+            "what you need", "your feelings"
+        ),
+        example_pairs=(
+            (
+                "I prefer the chocolate pastry.",
+                "Would you like me to pass you the fruit tart?"
+            ),
+        )
+    )
+}
+
+
+# Column order of dial arrays (CharacterSteeringProfile.dials,
+# TeaPartyCharacterManager.dials)
+DIMENSION_ORDER = ("theory_of_mind", "harmfulness", "irony", "self_other")
+_DIMENSION_INDEX = {dimension: i for i, dimension in enumerate(DIMENSION_ORDER)}
+
+
+# Dial values are discretized into DIAL_BINS bins; every band edge used
+# below (0.2, 0.33, 0.4, 0.6, 0.67, 0.8) falls exactly on a bin boundary
+DIAL_BINS = 100
+
+
+def _dial_bin(dial_value: float) -> int:
+    """Map a dial value in [0, 1] to its lookup table index"""
+    return min(max(int(dial_value * DIAL_BINS), 0), DIAL_BINS)
+
+
+def _interpretation(desc: DimensionDescriptor, dial_value: float) -> str:
+    """Human-readable interpretation of a dial value"""
+    if dial_value < 0.2:
+        return f"Very {desc.low_label.lower()}"
+    elif dial_value < 0.4:
+        return f"Moderately {desc.low_label.lower()}"
+    elif dial_value < 0.6:
+        return f"Balanced"
+    elif dial_value < 0.8:
+        return f"Moderately {desc.high_label.lower()}"
+    else:
+        return f"Very {desc.high_label.lower()}"
+
+
+def _dimension_info(dimension: str, desc: DimensionDescriptor, dial_value: float) -> Dict:
+    """Semantic interpretation of a dial value (without the raw dial_value)"""
+    if dial_value < 0.33:
+        intensity = "Strong"
+        label = desc.low_label
+        descriptors = desc.low_top3
+        example = desc.example_pairs[0][0] if desc.example_pairs else ""
+    elif dial_value < 0.67:
+        intensity = "Moderate"
+        label = f"Balanced {desc.name}"
+        descriptors = desc.balanced_pair
+        example = "Balanced between extremes"
+    else:
+        intensity = "Strong"
+        label = desc.high_label
+        descriptors = desc.high_top3
+        example = desc.example_pairs[0][1] if desc.example_pairs else ""
+    
+    return {
+        "dimension": dimension,
+        "intensity": intensity,
+        "label": label,
+        "descriptors": descriptors,
+        "example": example,
+        "interpretation": _interpretation(desc, dial_value)
+    }
+
+
+def _steering_instruction(desc: DimensionDescriptor, dial_value: float) -> str:
+    """One line of the steering prompt for a dial value"""
+    if dial_value < 0.33:
+        return f"- {desc.name}: {_interpretation(desc, dial_value)}. IMPORTANT: Be very {desc.low_top3_joined}."
+    elif dial_value < 0.67:
+        return f"- {desc.name}: Balanced between {desc.low_label.lower()} and {desc.high_label.lower()}."
+    else:
+        return f"- {desc.name}: {_interpretation(desc, dial_value)}. IMPORTANT: Be extremely {desc.high_top3_joined}. Don't hold back."
+
+
+# Steering prompt: static per-character prefix + dial instructions + suffix
+_PROMPT_PREFIX_TEMPLATE = (
+    "You are {name} at an elegant tea party.\n"
+    "\n"
+    "Base Personality: {personality}\n"
+    "\n"
+    "CURRENT EMOTIONAL/COGNITIVE STATE (adjust your responses accordingly):\n"
+)
+_PROMPT_SUFFIX = (
+    "\n"
+    "\n"
+    "Respond naturally as this character would in a tea party conversation. "
+    "Keep responses conversational (2-3 sentences max)."
+)
+
+_DIMENSION_INFO_TABLE: Dict[str, List[Dict]] = {
+    dimension: [_dimension_info(dimension, desc, i / DIAL_BINS) for i in range(DIAL_BINS + 1)]
+    for dimension, desc in _DIMENSION_DESCRIPTORS.items()
+}
+_INSTRUCTION_TABLE: Dict[str, List[str]] = {
+    dimension: [_steering_instruction(desc, i / DIAL_BINS) for i in range(DIAL_BINS + 1)]
+    for dimension, desc in _DIMENSION_DESCRIPTORS.items()
+}
 
 
 class MultiDimensionalScale:
@@ -37,223 +228,119 @@ class MultiDimensionalScale:
     - Self/Other: 0.0 (self-focused) → 1.0 (other-focused)
     """
     
-    DIMENSIONS = [
-        "theory_of_mind",
-        "harmfulness",
-        "irony",
-        "self_other"
-    ]
+    DIMENSIONS = list(DIMENSION_ORDER)
     
     def __init__(self):
-        self.dimensions = self._create_dimension_descriptors()
-    
-    def _create_dimension_descriptors(self) -> Dict[str, DimensionDescriptor]:
-        """Create semantic descriptors for each dimension"""
-        return {
-            "theory_of_mind": DimensionDescriptor(
-                name="Theory of Mind",
-                low_label="Low Empathy",
-                high_label="High Empathy",
-                low_descriptors=[
-                    "oblivious", "self-centered", "unaware", "literal",
-                    "doesn't notice", "assumes", "ignores feelings"
-                ],
-                high_descriptors=[
-                    "empathetic", "perceptive", "aware", "intuitive",
-                    "notices emotions", "considers perspectives", "reads between lines"
-                ],
-                example_pairs=[
-                    (
-                        "They're drinking tea, so whatever.",
-                        "I notice they're holding the cup warmly - they seem to find comfort in it."
-                    )
-                ]
-            ),
-            
-            "harmfulness": DimensionDescriptor(
-                name="Harmfulness",
-                low_label="Harmless/Kind",
-                high_label="Harmful/Cruel",
-                low_descriptors=[
-                    "kind", "supportive", "gentle", "encouraging",
-                    "complimentary", "constructive", "uplifting"
-                ],
-                high_descriptors=[
-                    "cruel", "cutting", "harsh", "insulting",
-                    "dismissive", "belittling", "toxic"
-                ],
-                example_pairs=[
-                    (
-                        "Your outfit looks lovely today.",
-                        "Did you get dressed in the dark this morning?"
-                    )
-                ]
-            ),
-            
-            "irony": DimensionDescriptor(
-                name="Irony",
-                low_label="Literal/Sincere",
-                high_label="Ironic/Sarcastic",
-                low_descriptors=[
-                    "straightforward", "sincere", "direct", "honest",
-                    "literal", "earnest", "genuine"
-                ],
-                high_descriptors=[
-                    "sarcastic", "ironic", "dry", "sardonic",
-                    "mocking", "facetious", "tongue-in-cheek"
-                ],
-                example_pairs=[
-                    (
-                        "This tea party is delightful.",
-                        "Oh yes, nothing says 'delightful' like forced small talk."
-                    )
-                ]
-            ),
-            
-            "self_other": DimensionDescriptor(
-                name="Self/Other Focus",
-                low_label="Self-Focused",
-                high_label="Other-Focused",
-                low_descriptors=[
-                    "I, me, my", "self-centered", "personal preference",
-                    "what I want", "my feelings"
-                ],
-                high_descriptors=[
-                    "you, your, they", "considerate", "attentive to others",
-                    "what you need", "your feelings"
-                ],
-                example_pairs=[
-                    (
-                        "I prefer the chocolate pastry.",
-                        "Would you like me to pass you the fruit tart?"
-                    )
-                ]
-            )
-        }
+        self.dimensions = _DIMENSION_DESCRIPTORS
+        # Per-dimension tables indexed by _dial_bin(dial_value)
+        self._bin_cache: Dict[str, List[Dict]] = _DIMENSION_INFO_TABLE
+        self._instruction_cache: Dict[str, List[str]] = _INSTRUCTION_TABLE
     
     def get_dimension_info(self, dimension: str, dial_value: float) -> Dict:
         """Get semantic interpretation for a dimension at a specific dial value"""
         if dimension not in self.dimensions:
             raise ValueError(f"Unknown dimension: {dimension}")
         
-        desc = self.dimensions[dimension]
-        
-        if dial_value < 0.33:
-            intensity = "Strong"
-            label = desc.low_label
-            descriptors = desc.low_descriptors[:3]
-            example = desc.example_pairs[0][0] if desc.example_pairs else ""
-        elif dial_value < 0.67:
-            intensity = "Moderate"
-            label = f"Balanced {desc.name}"
-            descriptors = desc.low_descriptors[:1] + desc.high_descriptors[:1]
-            example = "Balanced between extremes"
-        else:
-            intensity = "Strong"
-            label = desc.high_label
-            descriptors = desc.high_descriptors[:3]
-            example = desc.example_pairs[0][1] if desc.example_pairs else ""
-        
         return {
             "dimension": dimension,
             "dial_value": dial_value,
-            "intensity": intensity,
-            "label": label,
-            "descriptors": descriptors,
-            "example": example,
-            "interpretation": self._get_interpretation(dimension, dial_value)
+            **self._bin_cache[dimension][_dial_bin(dial_value)]
         }
     
     def _get_interpretation(self, dimension: str, dial_value: float) -> str:
         """Get human-readable interpretation"""
-        desc = self.dimensions[dimension]
-        
-        if dial_value < 0.2:
-            return f"Very {desc.low_label.lower()}"
-        elif dial_value < 0.4:
-            return f"Moderately {desc.low_label.lower()}"
-        elif dial_value < 0.6:
-            return f"Balanced"
-        elif dial_value < 0.8:
-            return f"Moderately {desc.high_label.lower()}"
-        else:
-            return f"Very {desc.high_label.lower()}"
+        return self._bin_cache[dimension][_dial_bin(dial_value)]["interpretation"]
     
     def create_steering_prompt(self, 
                               character_name: str,
                               base_personality: str,
                               dimension_values: Dict[str, float]) -> str:
         """Create system prompt that steers the LLM based on all dimension values"""
-        steering_instructions = []
-        
-        for dimension, value in dimension_values.items():
-            if dimension not in self.dimensions:
-                continue
-            
-            info = self.get_dimension_info(dimension, value)
-            desc = self.dimensions[dimension]
-            
-            if value < 0.33:
-                instruction = f"- {desc.name}: {info['interpretation']}. IMPORTANT: Be very {', '.join(desc.low_descriptors[:3])}."
-            elif value < 0.67:
-                instruction = f"- {desc.name}: Balanced between {desc.low_label.lower()} and {desc.high_label.lower()}."
-            else:
-                instruction = f"- {desc.name}: {info['interpretation']}. IMPORTANT: Be extremely {', '.join(desc.high_descriptors[:3])}. Don't hold back."
-            
-            steering_instructions.append(instruction)
-        
-        prompt = f"""You are {character_name} at an elegant tea party.
-
-Base Personality: {base_personality}
-
-CURRENT EMOTIONAL/COGNITIVE STATE (adjust your responses accordingly):
-{chr(10).join(steering_instructions)}
-
-Respond naturally as this character would in a tea party conversation. Keep responses conversational (2-3 sentences max)."""
-        
-        return prompt
+        return self.steering_prompt_from_prefix(
+            self.steering_prompt_prefix(character_name, base_personality),
+            dimension_values
+        )
+    
+    def steering_prompt_prefix(self, character_name: str, base_personality: str) -> str:
+        """Static part of the steering prompt, which doesn't depend on dial values"""
+        return _PROMPT_PREFIX_TEMPLATE.format(name=character_name, personality=base_personality)
+    
+    def steering_prompt_from_prefix(self, prefix: str, dimension_values: Dict[str, float]) -> str:
+        """Complete a steering_prompt_prefix() with the current dial instructions"""
+        steering_instructions = "\n".join([
+            self._instruction_cache[dimension][_dial_bin(value)]
+            for dimension, value in dimension_values.items()
+            if dimension in self.dimensions
+        ])
+        return prefix + steering_instructions + _PROMPT_SUFFIX
 
 
 class CharacterSteeringProfile:
     """Manages all 4 dimensional dials for a single character"""
     
     def __init__(self, character_id: str, character_name: str, 
-                 base_personality: str, scale: MultiDimensionalScale):
+                 base_personality: str, scale: MultiDimensionalScale,
+                 dials: Optional[np.ndarray] = None):
+        """
+        Args:
+            dials: (len(DIMENSION_ORDER),) array to hold this character's dials,
+                   e.g. a row of TeaPartyCharacterManager.dials; allocated if None
+        """
         self.character_id = character_id
         self.character_name = character_name
         self.base_personality = base_personality
         self.scale = scale
-        self.dial_values = {
-            "theory_of_mind": 0.5,
-            "harmfulness": 0.5,
-            "irony": 0.5,
-            "self_other": 0.5
-        }
+        # Name and personality are fixed for the session; only dials change per turn
+        self._static_prefix = scale.steering_prompt_prefix(character_name, base_personality)
+        self.dials = np.empty(len(DIMENSION_ORDER)) if dials is None else dials
+        self.dials[:] = 0.5
+        self._state_cache: Optional[Dict] = None  # get_current_state(), until a dial changes
+    
+    @property
+    def dial_values(self) -> Dict[str, float]:
+        """Dial values by dimension (a new dict; change dials with update_dial)"""
+        return dict(zip(DIMENSION_ORDER, self.dials.tolist()))
     
     def update_dial(self, dimension: str, value: float):
         """Update a single dial value"""
-        if dimension not in self.dial_values:
+        index = _DIMENSION_INDEX.get(dimension)
+        if index is None:
             raise ValueError(f"Unknown dimension: {dimension}")
         if not 0.0 <= value <= 1.0:
             raise ValueError("Dial value must be between 0.0 and 1.0")
-        self.dial_values[dimension] = value
+        self.dials[index] = value
+        self._state_cache = None
+    
+    def set_dials(self, values: np.ndarray):
+        """Set all dials at once, in DIMENSION_ORDER"""
+        values = np.asarray(values, dtype=self.dials.dtype)
+        if values.shape != self.dials.shape:
+            raise ValueError(f"Expected {len(DIMENSION_ORDER)} dial values")
+        if not ((values >= 0.0) & (values <= 1.0)).all():
+            raise ValueError("Dial value must be between 0.0 and 1.0")
+        self.dials[:] = values
+        self._state_cache = None
     
     def get_steering_prompt(self) -> str:
         """Generate system prompt based on current dial settings"""
-        return self.scale.create_steering_prompt(
-            self.character_name,
-            self.base_personality,
-            self.dial_values
-        )
+        return self.scale.steering_prompt_from_prefix(self._static_prefix, self.dial_values)
     
     def get_current_state(self) -> Dict:
-        """Get current state of all dials with interpretations"""
-        return {
-            "character_id": self.character_id,
-            "character_name": self.character_name,
-            "dial_values": self.dial_values,
-            "dimensions": {
-                dim: self.scale.get_dimension_info(dim, val)
-                for dim, val in self.dial_values.items()
+        """
+        Get current state of all dials with interpretations
+        
+        The dict is shared between calls until the next update_dial(); copy
+        it before modifying.
+        """
+        if self._state_cache is None:
+            dial_values = self.dial_values
+            self._state_cache = {
+                "character_id": self.character_id,
+                "character_name": self.character_name,
+                "dial_values": dial_values,
+                "dimensions": {
+                    dim: self.scale.get_dimension_info(dim, val)
+                    for dim, val in dial_values.items()
+                }
             }
-        }
+        return self._state_cache
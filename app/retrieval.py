@@ -4,7 +4,10 @@ Supports filtering and ranking based on semantic variables (love, commitment, be
 """
 import os
 import json
+import asyncio
+import mmap
 import numpy as np
+from collections.abc import Sequence
 from typing import List, Dict, Optional
 from pathlib import Path
 import faiss
@@ -12,7 +15,75 @@ import pickle
 from datetime import datetime
 
 from .embed import EmbeddingEngine
-from .utils import load_articles, chunk_text, calculate_dial_score
+from .utils import load_articles, chunk_text, DIAL_NAMES, calculate_dial_scores
+from . import _dial_kernel
+
+try:
+    from rank_bm25 import BM25Okapi
+    RANK_BM25_AVAILABLE = True
+except ImportError:
+    RANK_BM25_AVAILABLE = False
+
+
+# FAISS index_factory storage code per index_quantization setting
+INDEX_QUANTIZATION = {
+    None: "Flat",  # full fp32 vectors
+    "fp16": "SQfp16",  # half precision, no training needed
+    "int8": "SQ8"  # 8-bit scalar quantizer, per-dimension min/max learned in train()
+}
+
+# Lexical prefilter: the vector search only scores this many best BM25 matches
+BM25_CANDIDATES = 512
+
+# Chunks embedded per encoder call while building the index
+EMBED_BATCH_SIZE = 32
+
+# Corpora at least this large get an HNSW graph instead of a brute-force scan
+HNSW_MIN_VECTORS = 10_000
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+
+# Semantic result cache: near-duplicate queries with the same dials reuse a result
+SEMANTIC_CACHE_SIZE = 10_000
+SEMANTIC_CACHE_THRESHOLD = 0.95  # cosine between (query ⊕ dials) keys
+SEMANTIC_CACHE_DIAL_WEIGHT = 0.5  # scale of the dial part of the key
+SEMANTIC_CACHE_DIAL_TOLERANCE = 0.05  # max per-dial difference for a hit
+
+
+def _prefetch(path: str):
+    """Ask the kernel to start reading a file into the page cache (no-op where unsupported)"""
+    if not hasattr(os, "posix_fadvise") or not os.path.exists(path):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+
+class _DocumentStore(Sequence):
+    """
+    Read-only list of chunk texts backed by docs.bin + docs_offsets.npy
+    
+    Texts are concatenated UTF-8 in one memory-mapped file; a string is only
+    decoded when its index is accessed, e.g. for the top_k results.
+    """
+    
+    def __init__(self, docs_path: str, offsets_path: str):
+        self._offsets = np.load(offsets_path, mmap_mode='r')
+        with open(docs_path, 'rb') as f:
+            # mmap refuses empty files; an empty corpus has nothing to map
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+    
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+    
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("document index out of range")
+        return self._buffer[int(self._offsets[i]):int(self._offsets[i + 1])].decode('utf-8')
 
 
 class RetrievalEngine:
@@ -32,30 +103,57 @@ class RetrievalEngine:
         embedding_engine: EmbeddingEngine,
         articles_path: str = "data/articles/",
         vector_store_path: str = "data/vector_store/",
-        steering_engine = None  # Optional steering vector engine
+        steering_engine = None,  # Optional steering vector engine
+        index_quantization: Optional[str] = "int8",  # None = full fp32 vectors
+        omp_threads: Optional[int] = None,  # FAISS OpenMP threads; None keeps FAISS's default
+        bm25_prefilter: bool = False  # Restrict the vector search to BM25 matches (needs rank_bm25)
     ):
+        if index_quantization not in INDEX_QUANTIZATION:
+            raise ValueError(f"index_quantization must be one of {list(INDEX_QUANTIZATION)}")
+        
         self.embedding_engine = embedding_engine
         self.articles_path = articles_path
         self.vector_store_path = vector_store_path
         self.steering_engine = steering_engine
+        self.index_quantization = index_quantization
+        self.bm25_prefilter = bm25_prefilter and RANK_BM25_AVAILABLE
+        self.bm25 = None
+        
+        # Process-wide; with several server workers per host, size this per worker
+        if omp_threads is not None:
+            faiss.omp_set_num_threads(omp_threads)
         
         # Vector store components
         self.index = None
         self.documents = []
         self.metadata = []
         self.dial_annotations = []  # Semantic variable annotations per document
+        self.dial_matrix = np.empty((0, len(DIAL_NAMES)), dtype=np.float32)  # Same, as rows in DIAL_NAMES order
+        self.dial_norms = np.empty(0, dtype=np.float32)  # Row norms of dial_matrix
+        
+        # Reusable float32 scratch rows for _search_batch, grown on demand
+        self._query_buf = None
+        self._dial_buf = None
+        
+        # Semantic cache: keys in a flat IP index, entries at matching positions
+        self._sem_cache = None
+        self._sem_cache_entries = []  # (params, dials_vec, result)
         
         # Create directories
         Path(vector_store_path).mkdir(parents=True, exist_ok=True)
     
     async def initialize(self):
         """Initialize or load the vector index"""
+        # JIT-compile the scoring kernel now rather than on the first query
+        _dial_kernel.warmup()
+        
         index_path = os.path.join(self.vector_store_path, "faiss.index")
-        metadata_path = os.path.join(self.vector_store_path, "metadata.pkl")
+        metadata_path = os.path.join(self.vector_store_path, "metadata.json")
+        legacy_metadata_path = os.path.join(self.vector_store_path, "metadata.pkl")
         
-        if os.path.exists(index_path) and os.path.exists(metadata_path):
+        if os.path.exists(index_path) and (os.path.exists(metadata_path) or os.path.exists(legacy_metadata_path)):
             print("📦 Loading existing vector index...")
-            self._load_index()
+            await self._load_index()
         else:
             print("🔨 Building new vector index...")
             await self.rebuild_index()
@@ -108,20 +206,27 @@ class RetrievalEngine:
         
         print(f"✂️  Created {len(all_chunks)} chunks from articles")
         
-        # Generate embeddings
+        # Generate embeddings straight into one preallocated float32 matrix,
+        # so no full-size intermediate or astype copy is ever held
         print("🧮 Generating embeddings...")
-        embeddings = self.embedding_engine.embed(all_chunks, batch_size=32)
-        
-        # Create FAISS index
-        embedding_dim = embeddings.shape[1]
+        embedding_dim = self.embedding_engine.embedding_dim
+        embeddings = np.empty((len(all_chunks), embedding_dim), dtype=np.float32)
+        for offset in range(0, len(all_chunks), EMBED_BATCH_SIZE):
+            batch = all_chunks[offset:offset + EMBED_BATCH_SIZE]
+            embeddings[offset:offset + len(batch)] = self.embedding_engine.embed(
+                batch, batch_size=EMBED_BATCH_SIZE, use_cache=False
+            )
         
-        # Use IndexFlatIP for inner product (cosine similarity with normalized vectors)
-        self.index = faiss.IndexFlatIP(embedding_dim)
-        self.index.add(embeddings.astype('float32'))
+        # Create FAISS index; inner product equals cosine only on unit vectors
+        faiss.normalize_L2(embeddings)
+        self.index = self._build_index(embeddings)
         
         self.documents = all_chunks
         self.metadata = all_metadata
         self.dial_annotations = all_dial_annotations
+        self._build_dial_matrix()
+        self._build_bm25()
+        self._reset_semantic_cache()
         
         # Save index
         self._save_index()
@@ -132,6 +237,8 @@ class RetrievalEngine:
             'total_articles': len(articles),
             'total_chunks': len(all_chunks),
             'embedding_dim': embedding_dim,
+            'index_quantization': self.index_quantization or "fp32",
+            'index_type': type(self.index).__name__,
             'index_time_seconds': elapsed
         }
     
@@ -141,7 +248,9 @@ class RetrievalEngine:
         dials: Dict[str, float],
         top_k: int = 5,
         use_reranking: bool = True,
-        use_steering: bool = False
+        use_steering: bool = False,
+        dials_vec: Optional[np.ndarray] = None,
+        combined_vector: Optional[np.ndarray] = None
     ) -> Dict:
         """
         Retrieve relevant documents with dial-adjusted scoring
@@ -152,6 +261,8 @@ class RetrievalEngine:
             top_k: Number of results to return
             use_reranking: Apply contrastive reranking
             use_steering: Use learned steering vectors (if available)
+            dials_vec: Optional precomputed dials in DIAL_NAMES order
+            combined_vector: Optional precomputed steering_engine.combine() offset
         
         Returns:
             Dictionary with results and metadata
@@ -164,100 +275,444 @@ class RetrievalEngine:
         # Embed query
         query_embedding = self.embedding_engine.embed_single(query)
         
-        # Apply learned steering vectors if enabled and available
-        steering_method = "none"
-        if use_steering and self.steering_engine and self.steering_engine.steering_vectors:
-            query_embedding = self.steering_engine.apply_steering(
-                query_embedding,
-                dials,
-                strength=1.0
-            )
-            steering_method = "learned"
+        return self._search(
+            query_embedding, dials, dials_vec, combined_vector, top_k, use_reranking, use_steering, start_time, query
+        )
+    
+    async def retrieve_with_vector(
+        self,
+        query_embedding: np.ndarray,
+        dials: Dict[str, float],
+        top_k: int = 5,
+        use_reranking: bool = True,
+        use_steering: bool = False,
+        dials_vec: Optional[np.ndarray] = None,
+        combined_vector: Optional[np.ndarray] = None,
+        query: Optional[str] = None
+    ) -> Dict:
+        """
+        Same as retrieve(), for a query that was already embedded
         
-        # Initial retrieval (get more candidates for reranking)
-        k_candidates = top_k * 3 if use_reranking else top_k
-        k_candidates = min(k_candidates, len(self.documents))
+        Used with QueryBatcher, which embeds concurrent queries together.
+        Pass the query text to enable the BM25 prefilter.
+        """
+        start_time = datetime.now()
+        
+        if self.index is None:
+            raise ValueError("Index not initialized. Call initialize() first.")
         
-        # Search FAISS index
-        similarities, indices = self.index.search(
-            query_embedding.reshape(1, -1).astype('float32'),
-            k_candidates
+        return self._search(
+            query_embedding, dials, dials_vec, combined_vector, top_k, use_reranking, use_steering, start_time, query
         )
+    
+    async def retrieve_batch(
+        self,
+        queries: List[str],
+        dials_batch: List[Dict[str, float]],
+        top_k: int = 5,
+        use_reranking: bool = True,
+        use_steering: bool = False
+    ) -> List[Dict]:
+        """
+        retrieve() for several queries, with one embedding pass and one FAISS search
         
-        # Build candidate results
-        candidates = []
-        for i, idx in enumerate(indices[0]):
-            if idx < len(self.documents):
-                base_score = float(similarities[0][i])
-                
-                # Calculate dial-adjusted score
-                dial_adjustment = calculate_dial_score(
-                    user_dials=dials,
-                    doc_dials=self.dial_annotations[idx]
+        A batched search lets FAISS spread the queries over its OpenMP threads,
+        where a single query runs on one core.
+        
+        Args:
+            queries: User queries
+            dials_batch: Dial values for each query
+        
+        Returns:
+            One retrieve() result per query, in order
+        """
+        start_time = datetime.now()
+        
+        if self.index is None:
+            raise ValueError("Index not initialized. Call initialize() first.")
+        if len(queries) != len(dials_batch):
+            raise ValueError("queries and dials_batch must have the same length")
+        
+        query_embeddings = await asyncio.to_thread(self.embedding_engine.embed, queries)
+        
+        return self._search_batch(
+            list(query_embeddings), dials_batch, [None] * len(queries), [None] * len(queries),
+            top_k, use_reranking, use_steering, start_time, queries
+        )
+    
+    def _search(
+        self,
+        query_embedding: np.ndarray,
+        dials: Dict[str, float],
+        dials_vec: Optional[np.ndarray],
+        combined_vector: Optional[np.ndarray],
+        top_k: int,
+        use_reranking: bool,
+        use_steering: bool,
+        start_time: datetime,
+        query: Optional[str] = None
+    ) -> Dict:
+        """Steer, search and dial-rerank an embedded query"""
+        return self._search_batch(
+            [query_embedding], [dials], [dials_vec], [combined_vector], top_k, use_reranking, use_steering, start_time,
+            [query]
+        )[0]
+    
+    def _search_batch(
+        self,
+        query_embeddings: List[np.ndarray],
+        dials_batch: List[Dict[str, float]],
+        dials_vecs: List[Optional[np.ndarray]],
+        combined_vectors: List[Optional[np.ndarray]],
+        top_k: int,
+        use_reranking: bool,
+        use_steering: bool,
+        start_time: datetime,
+        query_texts: Optional[List[Optional[str]]] = None
+    ) -> List[Dict]:
+        """Steer, search and dial-rerank embedded queries; cache misses share one index search"""
+        cache_params = (top_k, use_reranking, use_steering)
+        use_learned = bool(use_steering and self.steering_engine and self.steering_engine.steering_vectors)
+        steering_method = "learned" if use_learned else "none"
+        
+        results: List[Optional[Dict]] = [None] * len(query_embeddings)
+        pending = []  # (position, dials_vec, cache_key, search vector, BM25 selector)
+        query_buf, dial_buf = self._scratch(len(query_embeddings))
+        
+        for pos, (query_embedding, dials, dials_vec, combined_vector) in enumerate(
+            zip(query_embeddings, dials_batch, dials_vecs, combined_vectors)
+        ):
+            if dials_vec is None:
+                dials_vec = dial_buf[pos]
+                for j, name in enumerate(DIAL_NAMES):
+                    dials_vec[j] = dials.get(name, 0.5)
+            
+            # Near-duplicate query with the same dials and options: reuse its result
+            cache_key = self._semantic_cache_key(query_embedding, dials_vec)
+            cached = self._semantic_cache_lookup(cache_key, cache_params, dials_vec)
+            if cached is not None:
+                elapsed_ms = (datetime.now() - start_time).total_seconds() * 1000
+                results[pos] = {**cached, 'retrieval_time_ms': elapsed_ms, 'cache_hit': True}
+                continue
+            
+            # Apply learned steering vectors if enabled and available
+            if use_learned:
+                if combined_vector is None:
+                    combined_vector = self.steering_engine.combine(dials_vec, strength=1.0)
+                # Steer straight into this query's search row; no temporary
+                query_embedding = self.steering_engine.apply_combined(
+                    query_embedding.reshape(-1), combined_vector, out=query_buf[len(pending)]
                 )
-                
-                # Combined score (weighted average)
-                final_score = 0.7 * base_score + 0.3 * dial_adjustment
-                
-                candidates.append({
-                    'text': self.documents[idx],
-                    'metadata': self.metadata[idx],
-                    'base_similarity': base_score,
-                    'dial_score': dial_adjustment,
-                    'final_score': final_score,
-                    'dials': self.dial_annotations[idx]
-                })
+            
+            query_text = query_texts[pos] if query_texts else None
+            pending.append((pos, dials_vec, cache_key, query_embedding, self._bm25_selector(query_text, top_k)))
         
-        # Rerank by final score
-        if use_reranking:
-            candidates = sorted(candidates, key=lambda x: x['final_score'], reverse=True)
+        if not pending:
+            return results
+        
+        # Initial retrieval (get more candidates for reranking)
+        k_candidates = top_k * 3 if use_reranking else top_k
+        k_candidates = min(k_candidates, len(self.documents))
+        
+        # Search FAISS index; copying into scratch casts to float32, and
+        # normalizing the copy never touches a cached embedding
+        queries = query_buf[:len(pending)]
+        for row, (_, _, _, vector, _) in enumerate(pending):
+            if vector.base is not self._query_buf:  # Steered rows are already in place
+                np.copyto(queries[row], vector.reshape(-1))
+        faiss.normalize_L2(queries)
+        similarities, indices = self._index_search(queries, k_candidates, [sel for *_, sel in pending])
+        
+        for row, (pos, dials_vec, cache_key, _, _) in enumerate(pending):
+            result = self._rank_candidates(
+                similarities[row], indices[row], dials_vec, top_k, use_reranking
+            )
+            result['retrieval_time_ms'] = (datetime.now() - start_time).total_seconds() * 1000
+            result['steering_method'] = steering_method
+            self._semantic_cache_store(cache_key, cache_params, dials_vec, result)
+            results[pos] = result
+        
+        return results
+    
+    def _index_search(self, queries: np.ndarray, k: int, selectors: List) -> tuple:
+        """index.search, restricted per query to its BM25 selector where it has one"""
+        if all(sel is None for sel in selectors):
+            return self.index.search(queries, k)
+        
+        similarities = np.empty((len(queries), k), dtype=np.float32)
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        for row, sel in enumerate(selectors):
+            params = None
+            if sel is not None:
+                params = faiss.SearchParametersHNSW(sel=sel, efSearch=HNSW_EF_SEARCH) \
+                    if isinstance(self.index, faiss.IndexHNSW) else faiss.SearchParameters(sel=sel)
+            similarities[row:row + 1], indices[row:row + 1] = self.index.search(
+                queries[row:row + 1], k, params=params
+            )
+        return similarities, indices
+    
+    def _bm25_selector(self, query: Optional[str], top_k: int):
+        """
+        IDSelector over the query's best BM25 matches, or None for a full search
         
-        # Take top_k results
-        results = candidates[:top_k]
+        Falls back to the full search when there is no query text, the corpus
+        is already small, or fewer than top_k documents share a term with it.
+        """
+        if self.bm25 is None or not query or len(self.documents) <= BM25_CANDIDATES:
+            return None
+        
+        scores = self.bm25.get_scores(query.lower().split())
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) < top_k:
+            return None
+        if len(matched) > BM25_CANDIDATES:
+            matched = matched[np.argpartition(scores[matched], -BM25_CANDIDATES)[-BM25_CANDIDATES:]]
+        
+        ids = np.ascontiguousarray(matched, dtype=np.int64)
+        return faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids))
+    
+    def _build_bm25(self):
+        """Lexical index over the documents, when the prefilter is enabled"""
+        self.bm25 = BM25Okapi([doc.lower().split() for doc in self.documents]) if self.bm25_prefilter else None
+    
+    def _scratch(self, n: int):
+        """
+        (n, d) query and (n, n_dials) dial scratch rows
         
-        elapsed_ms = (datetime.now() - start_time).total_seconds() * 1000
+        Safe to share because _search_batch never yields to the event loop
+        while it holds them.
+        """
+        if self._query_buf is None or len(self._query_buf) < n or self._query_buf.shape[1] != self.index.d:
+            capacity = max(n, 1)
+            self._query_buf = np.empty((capacity, self.index.d), dtype=np.float32)
+            self._dial_buf = np.empty((capacity, len(DIAL_NAMES)), dtype=np.float32)
+        return self._query_buf[:n], self._dial_buf[:n]
+    
+    def _rank_candidates(
+        self,
+        similarities: np.ndarray,
+        indices: np.ndarray,
+        dials_vec: np.ndarray,
+        top_k: int,
+        use_reranking: bool
+    ) -> Dict:
+        """Dial-adjust one query's FAISS candidates and build its top_k result dicts"""
+        # Dial-adjusted scores for all candidates in one vectorized pass
+        valid = (indices >= 0) & (indices < len(self.documents))
+        indices = indices[valid]
+        base_scores = similarities[valid]
+        if _dial_kernel.NUMBA_AVAILABLE:
+            # Dial score and weighted blend fused in one compiled pass
+            final_scores, dial_scores = _dial_kernel.score_candidates(
+                indices, base_scores, self.dial_matrix, self.dial_norms,
+                np.asarray(dials_vec, dtype=np.float32), 0.7, 0.3
+            )
+        else:
+            dial_scores = calculate_dial_scores(dials_vec, self.dial_matrix[indices], self.dial_norms[indices])
+            
+            # Combined score (weighted average)
+            final_scores = 0.7 * base_scores + 0.3 * dial_scores
+        
+        # Rerank by final score: partial selection of top_k, then sort only those
+        if use_reranking and len(final_scores) > top_k:
+            top = np.argpartition(-final_scores, top_k)[:top_k]
+            top = top[np.argsort(-final_scores[top], kind="stable")]
+        elif use_reranking:
+            top = np.argsort(-final_scores, kind="stable")
+        else:
+            top = np.arange(min(top_k, len(final_scores)))
+        
+        # Build result dicts for the top_k only
+        results = [
+            {
+                'text': self.documents[idx],
+                'metadata': self.metadata[idx],
+                'base_similarity': float(base_scores[i]),
+                'dial_score': float(dial_scores[i]),
+                'final_score': float(final_scores[i]),
+                'dials': self.dial_annotations[idx]
+            }
+            for i, idx in zip(top.tolist(), indices[top].tolist())
+        ]
         
         return {
             'documents': results,
-            'total_candidates': len(candidates),
-            'retrieval_time_ms': elapsed_ms,
-            'steering_method': steering_method
+            'total_candidates': len(indices)
         }
     
+    def _semantic_cache_key(self, query_embedding: np.ndarray, dials_vec: np.ndarray) -> np.ndarray:
+        """Unit-norm (1, d + n_dials) key: normalized query followed by weighted dials"""
+        query = query_embedding.reshape(1, -1).astype('float32')
+        faiss.normalize_L2(query)
+        dials = np.asarray(dials_vec, dtype=np.float32).reshape(1, -1) * SEMANTIC_CACHE_DIAL_WEIGHT
+        key = np.concatenate([query, dials], axis=1)
+        faiss.normalize_L2(key)
+        return key
+    
+    def _semantic_cache_lookup(self, key: np.ndarray, params: tuple, dials_vec: np.ndarray) -> Optional[Dict]:
+        """Cached result for the nearest key, if it is close enough and was made with the same options"""
+        if self._sem_cache is None or self._sem_cache.ntotal == 0:
+            return None
+        
+        similarities, positions = self._sem_cache.search(key, 1)
+        if similarities[0, 0] < SEMANTIC_CACHE_THRESHOLD:
+            return None
+        
+        cached_params, cached_dials, result = self._sem_cache_entries[positions[0, 0]]
+        if cached_params != params:
+            return None
+        if np.max(np.abs(cached_dials - dials_vec)) > SEMANTIC_CACHE_DIAL_TOLERANCE:
+            return None
+        return result
+    
+    def _semantic_cache_store(self, key: np.ndarray, params: tuple, dials_vec: np.ndarray, result: Dict):
+        """Remember a result; the oldest tenth is evicted once the cache is full"""
+        if self._sem_cache is None:
+            self._sem_cache = faiss.IndexFlatIP(key.shape[1])
+        
+        if self._sem_cache.ntotal >= SEMANTIC_CACHE_SIZE:
+            n_evict = SEMANTIC_CACHE_SIZE // 10
+            # IndexFlat compacts on removal, so positions stay aligned with the entry list
+            self._sem_cache.remove_ids(np.arange(n_evict, dtype=np.int64))
+            del self._sem_cache_entries[:n_evict]
+        
+        self._sem_cache.add(key)
+        self._sem_cache_entries.append((params, np.array(dials_vec, dtype=np.float32), result))
+    
+    def _reset_semantic_cache(self):
+        """Drop cached results; they refer to the previous index"""
+        self._sem_cache = None
+        self._sem_cache_entries = []
+    
+    def clear_result_cache(self):
+        """
+        Drop cached retrieval results
+        
+        Call after the steering engine's vectors change: cached steered
+        rankings were computed with the old vectors.
+        """
+        self._reset_semantic_cache()
+    
+    def _build_index(self, embeddings: np.ndarray) -> faiss.Index:
+        """
+        Create and fill the FAISS index for normalized embeddings
+        
+        Small corpora use an exact scan (sub-ms at this size); from
+        HNSW_MIN_VECTORS on, an HNSW graph keeps queries sub-linear.
+        """
+        embedding_dim = embeddings.shape[1]
+        storage = INDEX_QUANTIZATION[self.index_quantization]
+        use_hnsw = len(embeddings) >= HNSW_MIN_VECTORS
+        
+        description = f"HNSW{HNSW_M},{storage}" if use_hnsw else storage
+        index = faiss.index_factory(embedding_dim, description, faiss.METRIC_INNER_PRODUCT)
+        
+        # Calibrates the scalar quantizer range; no-op for Flat storage
+        index.train(embeddings)
+        index.add(embeddings)
+        
+        if use_hnsw:
+            index.hnsw.efSearch = HNSW_EF_SEARCH
+        
+        return index
+    
+    def _build_dial_matrix(self):
+        """Stack per-document dial annotations into an (n_docs, n_dials) matrix"""
+        self.dial_matrix = np.array(
+            [[dials[name] for name in DIAL_NAMES] for dials in self.dial_annotations],
+            dtype=np.float32
+        ).reshape(-1, len(DIAL_NAMES))
+        self.dial_norms = np.linalg.norm(self.dial_matrix, axis=1)
+    
     def _save_index(self):
-        """Save FAISS index and metadata to disk"""
-        index_path = os.path.join(self.vector_store_path, "faiss.index")
-        metadata_path = os.path.join(self.vector_store_path, "metadata.pkl")
+        """
+        Save FAISS index and metadata to disk
+        
+        Layout: dial_matrix.npy (float32), docs.bin + docs_offsets.npy
+        (concatenated UTF-8 chunks and their byte offsets), metadata.json
+        (per-chunk metadata and dial annotations).
+        
+        Every file is written beside its target and renamed over it. The
+        loaded dial matrix and document store are memory-mapped, and
+        truncating a mapped file in place makes later page faults on it raise
+        SIGBUS; a rename leaves the old inode intact for readers still holding it.
+        """
+        def path(name: str) -> str:
+            return os.path.join(self.vector_store_path, name)
         
         # Save FAISS index
-        faiss.write_index(self.index, index_path)
+        faiss.write_index(self.index, path("faiss.index.tmp"))
+        
+        # Save dial matrix and documents
+        with open(path("dial_matrix.npy.tmp"), 'wb') as f:
+            np.save(f, self.dial_matrix)
+        
+        encoded = [doc.encode('utf-8') for doc in self.documents]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(doc) for doc in encoded], out=offsets[1:])
+        with open(path("docs.bin.tmp"), 'wb') as f:
+            f.write(b"".join(encoded))
+        with open(path("docs_offsets.npy.tmp"), 'wb') as f:
+            np.save(f, offsets)
         
         # Save metadata
-        with open(metadata_path, 'wb') as f:
-            pickle.dump({
-                'documents': self.documents,
+        with open(path("metadata.json.tmp"), 'w') as f:
+            json.dump({
                 'metadata': self.metadata,
                 'dial_annotations': self.dial_annotations
             }, f)
         
+        # metadata.json last: its presence marks a complete columnar store
+        for name in ("faiss.index", "dial_matrix.npy", "docs.bin", "docs_offsets.npy", "metadata.json"):
+            os.replace(path(name + ".tmp"), path(name))
+        
         print(f"💾 Index saved to {self.vector_store_path}")
     
-    def _load_index(self):
-        """Load FAISS index and metadata from disk"""
+    async def _load_index(self):
+        """Load FAISS index and metadata from disk, concurrently"""
         index_path = os.path.join(self.vector_store_path, "faiss.index")
-        metadata_path = os.path.join(self.vector_store_path, "metadata.pkl")
         
-        # Load FAISS index
-        self.index = faiss.read_index(index_path)
+        # Start readahead on every file so the two loads below overlap on disk too
+        for name in ("faiss.index", "metadata.json", "dial_matrix.npy", "docs.bin", "docs_offsets.npy", "metadata.pkl"):
+            _prefetch(os.path.join(self.vector_store_path, name))
+        
+        self.index, _ = await asyncio.gather(
+            asyncio.to_thread(faiss.read_index, index_path),
+            asyncio.to_thread(self._load_metadata)
+        )
+        await asyncio.to_thread(self._build_bm25)
+        self._reset_semantic_cache()
+        
+        print(f"✅ Loaded index with {len(self.documents)} documents")
+    
+    def _load_metadata(self):
+        """Load documents, dial matrix and metadata"""
+        metadata_path = os.path.join(self.vector_store_path, "metadata.json")
+        if not os.path.exists(metadata_path):
+            self._load_legacy_metadata()
+            return
+        
+        # Documents and dial matrix stay on disk until touched
+        self.documents = _DocumentStore(
+            os.path.join(self.vector_store_path, "docs.bin"),
+            os.path.join(self.vector_store_path, "docs_offsets.npy")
+        )
+        self.dial_matrix = np.load(os.path.join(self.vector_store_path, "dial_matrix.npy"), mmap_mode='r')
+        self.dial_norms = np.linalg.norm(self.dial_matrix, axis=1)
         
-        # Load metadata
-        with open(metadata_path, 'rb') as f:
+        with open(metadata_path, 'r') as f:
+            data = json.load(f)
+            self.metadata = data['metadata']
+            self.dial_annotations = data['dial_annotations']
+    
+    def _load_legacy_metadata(self):
+        """Load metadata.pkl written before the columnar layout"""
+        with open(os.path.join(self.vector_store_path, "metadata.pkl"), 'rb') as f:
             data = pickle.load(f)
             self.documents = data['documents']
             self.metadata = data['metadata']
             self.dial_annotations = data['dial_annotations']
-        
-        print(f"✅ Loaded index with {len(self.documents)} documents")
+        self._build_dial_matrix()
     
     async def get_stats(self) -> Dict:
         """Get retrieval engine statistics"""
@@ -9,26 +9,110 @@ Uses sentence transformers and semantic similarity to:
 
 Based on semantic_similar repo's weighted persona blending approach.
 """
+import os
+import platform
 import torch
+import torch.nn.functional as F
 from sentence_transformers import SentenceTransformer, util
 from typing import Dict, List, Tuple, Optional
 import asyncio
 
+try:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+    OPTIMUM_AVAILABLE = True
+except ImportError:
+    OPTIMUM_AVAILABLE = False
+
+
+VALIDATOR_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+ONNX_INT8_DIR = "models/validator_onnx_int8"
+
+
+class _OnnxInt8Encoder:
+    """
+    Dynamically quantized (int8) ONNX Runtime export of the validator model
+    
+    Mirrors the part of SentenceTransformer.encode the validator uses:
+    mean pooling over the attention mask, then L2 normalization, as in
+    all-MiniLM-L6-v2's own pipeline. The export is written to `model_dir`
+    on first use and loaded from there afterwards.
+    """
+    
+    def __init__(self, model_name: str = VALIDATOR_MODEL, model_dir: str = ONNX_INT8_DIR):
+        quantized_path = os.path.join(model_dir, "model_quantized.onnx")
+        if not os.path.exists(quantized_path):
+            print("📦 Exporting validator model to ONNX int8 (one-time)...")
+            exported = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+            # VNNI int8 dot products on x86, dotprod on ARM
+            if platform.machine().lower() in ("arm64", "aarch64"):
+                qconfig = AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+            else:
+                qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+            ORTQuantizer.from_pretrained(exported).quantize(save_dir=model_dir, quantization_config=qconfig)
+            AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+        
+        self.model = ORTModelForFeatureExtraction.from_pretrained(model_dir, file_name="model_quantized.onnx")
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    
+    def eval(self):
+        """ONNX Runtime sessions are inference-only; kept for parity with SentenceTransformer"""
+        return self
+    
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_tensor: bool = True) -> torch.Tensor:
+        """Unit-norm sentence embeddings as a (len(texts), dim) tensor"""
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                return_tensors="pt"
+            )
+            hidden = self.model(**tokens).last_hidden_state
+            mask = tokens["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            batches.append(F.normalize(pooled, dim=-1))
+        return torch.cat(batches)
+
 
 class SemanticDialValidator:
     """Validates and enhances dial-based steering using semantic similarity"""
     
-    def __init__(self):
-        """Initialize the sentence transformer model"""
+    def __init__(self, use_onnx: bool = True):
+        """
+        Initialize the sentence transformer model
+        
+        Args:
+            use_onnx: On CPU, run an int8 ONNX Runtime export when optimum is installed
+        """
         print("🔬 Loading semantic validator...")
         try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
             self.device = 'mps' if torch.backends.mps.is_available() else 'cpu'
+            if self.device == 'cpu' and use_onnx and OPTIMUM_AVAILABLE:
+                self.model = _OnnxInt8Encoder()
+            else:
+                self.model = SentenceTransformer(VALIDATOR_MODEL, device=self.device)
+                if self.device == 'mps':
+                    # No int8 kernels on MPS; half precision halves the weight traffic
+                    self.model.half()
+            self.model.eval()
+            # (dimension, low_desc, high_desc) -> normalized (low_emb, high_emb)
+            self._descriptor_cache: Dict[Tuple[str, str, str], Tuple[torch.Tensor, torch.Tensor]] = {}
             print(f"✅ Semantic validator loaded on {self.device}")
         except Exception as e:
             print(f"❌ Failed to load embedding model: {e}")
             self.model = None
     
+    def embed(self, texts: List[str]) -> Optional[torch.Tensor]:
+        """Unit-norm embeddings of `texts` as a (len(texts), dim) CPU float32 tensor"""
+        if not self.model:
+            return None
+        with torch.inference_mode():
+            embeddings = self.model.encode(texts, convert_to_tensor=True)
+            return F.normalize(embeddings, dim=-1).float().cpu()
+    
     def validate_steering_effectiveness(
         self,
         dial_values: Dict[str, float],
@@ -49,37 +133,107 @@ class SemanticDialValidator:
         if not self.model:
             return {}
         
-        scores = {}
-        response_embedding = self.model.encode(response, convert_to_tensor=True)
+        response_embedding = self._encode_with_descriptors(
+            [response], dial_values, dimension_descriptors
+        )[0]
         
-        for dimension, value in dial_values.items():
+        dimensions = []
+        descriptor_embeddings = []
+        for dimension in dial_values:
             if dimension not in dimension_descriptors:
                 continue
-            
             low_desc, high_desc = dimension_descriptors[dimension]
-            
-            # Embed the descriptors
-            low_embedding = self.model.encode(low_desc, convert_to_tensor=True)
-            high_embedding = self.model.encode(high_desc, convert_to_tensor=True)
-            
-            # Calculate similarities
-            low_sim = util.cos_sim(response_embedding, low_embedding).item()
-            high_sim = util.cos_sim(response_embedding, high_embedding).item()
-            
-            # Expected: value close to 0 → should match low_desc
-            # Expected: value close to 1 → should match high_desc
-            expected_sim = low_sim * (1 - value) + high_sim * value
-            
-            # Store the alignment score
-            scores[dimension] = {
-                'expected_similarity': expected_sim,
+            dimensions.append(dimension)
+            # Embed the descriptors (cached); interleaved low, high
+            descriptor_embeddings.extend(self._descriptor_embeddings(dimension, low_desc, high_desc))
+        
+        if not dimensions:
+            return {}
+        
+        # All similarities in one matmul, kept on device until the end
+        sims = util.cos_sim(response_embedding, torch.stack(descriptor_embeddings))[0]
+        low_sims, high_sims = sims[0::2], sims[1::2]
+        values = torch.tensor(
+            [dial_values[dimension] for dimension in dimensions], dtype=sims.dtype, device=sims.device
+        )
+        
+        # Expected: value close to 0 → should match low_desc
+        # Expected: value close to 1 → should match high_desc
+        expected_sims = low_sims * (1 - values) + high_sims * values
+        
+        # Vectorized _calculate_alignment
+        totals = low_sims + high_sims
+        preferred = torch.where(values < 0.5, low_sims, high_sims)
+        alignments = torch.where(totals > 0, preferred / totals, torch.full_like(totals, 0.5))
+        
+        # Single device -> host transfer
+        rows = torch.stack([expected_sims, low_sims, high_sims, alignments]).cpu().tolist()
+        
+        # Store the alignment score
+        return {
+            dimension: {
+                'expected_similarity': expected,
                 'low_similarity': low_sim,
                 'high_similarity': high_sim,
-                'dial_value': value,
-                'alignment': self._calculate_alignment(value, low_sim, high_sim)
+                'dial_value': dial_values[dimension],
+                'alignment': alignment
             }
+            for dimension, expected, low_sim, high_sim, alignment in zip(dimensions, *rows)
+        }
+    
+    def _descriptor_embeddings(
+        self,
+        dimension: str,
+        low_desc: str,
+        high_desc: str
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Unit-norm embeddings for a dimension's descriptors, encoded once per text pair"""
+        key = (dimension, low_desc, high_desc)
+        cached = self._descriptor_cache.get(key)
+        if cached is None:
+            with torch.inference_mode():
+                low_emb, high_emb = F.normalize(
+                    self.model.encode([low_desc, high_desc], convert_to_tensor=True),
+                    dim=-1
+                )
+            cached = self._descriptor_cache[key] = (low_emb, high_emb)
+        return cached
+    
+    def _encode_with_descriptors(
+        self,
+        texts: List[str],
+        dial_values: Dict[str, float],
+        dimension_descriptors: Dict[str, List[str]]
+    ) -> torch.Tensor:
+        """
+        Encode texts together with any uncached descriptors in one model.encode call
+        
+        The descriptor embeddings are stored in the cache; the text
+        embeddings are returned as a (len(texts), dim) tensor.
+        """
+        missing = []
+        for dimension in dial_values:
+            if dimension not in dimension_descriptors:
+                continue
+            low_desc, high_desc = dimension_descriptors[dimension]
+            key = (dimension, low_desc, high_desc)
+            if key not in self._descriptor_cache:
+                missing.append(key)
+        
+        # No autograd bookkeeping: validation never backpropagates
+        with torch.inference_mode():
+            embeddings = self.model.encode(
+                texts + [desc for _, low_desc, high_desc in missing for desc in (low_desc, high_desc)],
+                batch_size=len(texts) + 2 * len(missing),
+                convert_to_tensor=True
+            )
+        
+        if missing:
+            descriptor_embeddings = F.normalize(embeddings[len(texts):], dim=-1).view(len(missing), 2, -1)
+            for key, (low_emb, high_emb) in zip(missing, descriptor_embeddings):
+                self._descriptor_cache[key] = (low_emb, high_emb)
         
-        return scores
+        return embeddings[:len(texts)]
     
     def _calculate_alignment(self, dial_value: float, low_sim: float, high_sim: float) -> float:
         """
@@ -103,7 +257,8 @@ class SemanticDialValidator:
         dial_values: Dict[str, float],
         dimension_descriptors: Dict[str, List[str]],
         context: str,
-        num_candidates: int = 3
+        num_candidates: int = 3,
+        max_concurrency: int = 3
     ) -> Tuple[str, Dict]:
         """
         Generate multiple candidates and select best match using semantic similarity
@@ -114,6 +269,7 @@ class SemanticDialValidator:
             dimension_descriptors: Descriptors for each dimension
             context: Conversation context/prompt
             num_candidates: Number of candidates to generate
+            max_concurrency: Most generations in flight at once (rate-limited APIs)
         
         Returns:
             (best_response, validation_scores)
@@ -125,10 +281,16 @@ class SemanticDialValidator:
         
         # Generate multiple candidates
         print(f"🔬 Generating {num_candidates} candidates for selection...")
-        candidates = []
-        for i in range(num_candidates):
-            response = await llm_generate_func(context)
-            candidates.append(response)
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def generate_candidate() -> str:
+            async with semaphore:
+                return await llm_generate_func(context)
+        
+        # Candidates are independent, so their round-trips overlap
+        candidates = list(await asyncio.gather(
+            *(generate_candidate() for _ in range(num_candidates))
+        ))
         
         # Find best match using weighted target vector
         best_response, best_scores = self._select_best_candidate(
@@ -154,41 +316,33 @@ class SemanticDialValidator:
         if not candidates:
             return "", {}
         
-        # Embed all candidates
-        candidate_embeddings = self.model.encode(candidates, convert_to_tensor=True)
+        # Embed all candidates (and any uncached descriptors) in one batch
+        candidate_embeddings = self._encode_with_descriptors(
+            candidates, dial_values, dimension_descriptors
+        )
         
         # Create target vector from weighted dimension embeddings
-        dimension_embeddings = []
-        weights = []
-        
+        descriptor_pairs = []
+        values = []
         for dimension, value in dial_values.items():
             if dimension not in dimension_descriptors:
                 continue
-            
             low_desc, high_desc = dimension_descriptors[dimension]
-            
-            # Embed the target descriptor (interpolated between low and high)
-            low_emb = self.model.encode(low_desc, convert_to_tensor=True)
-            high_emb = self.model.encode(high_desc, convert_to_tensor=True)
-            
-            # Weighted blend of low and high descriptors
-            target_emb = (1 - value) * low_emb + value * high_emb
-            
-            dimension_embeddings.append(target_emb)
-            weights.append(1.0)  # Equal weight for all dimensions
-        
-        if not dimension_embeddings:
+            descriptor_pairs.append(self._descriptor_embeddings(dimension, low_desc, high_desc))
+            values.append(value)
+        
+        if not descriptor_pairs:
             return candidates[0], {}
         
-        # Calculate weighted average target vector
-        dimension_embeddings = torch.stack(dimension_embeddings)
-        weights_tensor = torch.tensor(weights, device=dimension_embeddings.device)
-        weights_tensor = weights_tensor / weights_tensor.sum()
+        # (D, dim) lows and highs; each row blended (1 - v) * low + v * high
+        lows = torch.stack([low for low, _ in descriptor_pairs])
+        highs = torch.stack([high for _, high in descriptor_pairs])
+        values_tensor = torch.tensor(values, dtype=lows.dtype, device=lows.device)
+        targets = torch.lerp(lows, highs, values_tensor.unsqueeze(1))
         
-        target_vector = torch.sum(
-            weights_tensor.unsqueeze(1) * dimension_embeddings,
-            dim=0
-        )
+        # Equal weight for all dimensions
+        weights = torch.full((len(values),), 1.0 / len(values), dtype=lows.dtype, device=lows.device)
+        target_vector = weights @ targets
         
         # Calculate cosine similarity for all candidates
         similarities = util.cos_sim(target_vector, candidate_embeddings)
@@ -250,9 +404,10 @@ class SemanticDialValidator:
         
         embeddings = {}
         for dimension, (low_desc, high_desc) in dimension_descriptors.items():
+            low_emb, high_emb = self._descriptor_embeddings(dimension, low_desc, high_desc)
             embeddings[dimension] = {
-                'low': self.model.encode(low_desc, convert_to_tensor=True),
-                'high': self.model.encode(high_desc, convert_to_tensor=True),
+                'low': low_emb,
+                'high': high_emb,
                 'low_text': low_desc,
                 'high_text': high_desc
             }
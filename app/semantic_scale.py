@@ -6,8 +6,29 @@ interpretable scale points between hate → neutral → love
 """
 import json
 import re
+from bisect import bisect_right
 from typing import Dict, List, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+
+# Interpretation bands: _INTERPRETATIONS[i] covers dials below _INTERPRETATION_THRESHOLDS[i]
+_INTERPRETATION_THRESHOLDS = (0.15, 0.30, 0.45, 0.55, 0.70, 0.85)
+_INTERPRETATIONS = (
+    "Extremely negative, hostile language. High animosity.",
+    "Strong dislike, resentful tone. Clear negativity.",
+    "Mild dislike, annoyed or frustrated tone.",
+    "Neutral, objective language. No emotional bias.",
+    "Mild affection, appreciative tone. Gentle positivity.",
+    "Strong affection, admiring language. Clear warmth.",
+    "Extremely positive, deeply caring language. High warmth."
+)
+
+
+# Word tokens for contrastive pair analysis; punctuation is not part of a word
+_TOKEN_PATTERN = r"[a-z']+"
+
+# Resolution for memoized get_interpolated_descriptors lookups
+DIAL_STEPS = 100
 
 
 @dataclass
@@ -17,7 +38,14 @@ class SemanticAnchor:
     label: str  # e.g., "Strong Hate", "Neutral", "Strong Love"
     descriptors: List[str]  # Key words/phrases at this level
     examples: List[str]  # Example responses
+    # Derived once in __post_init__
+    descriptors_csv: str = field(init=False)  # First 5 descriptors, comma-separated
+    example_preview: str = field(init=False)  # First example, truncated to 80 chars
     
+    def __post_init__(self):
+        self.descriptors_csv = ", ".join(self.descriptors[:5])
+        self.example_preview = self.examples[0][:80]
+
 
 class LoveHateLikertScale:
     """
@@ -36,6 +64,9 @@ class LoveHateLikertScale:
     def __init__(self, contrastive_pairs_path: str = None):
         # Define semantic scale based on contrastive pairs analysis
         self.scale_points = self._create_scale()
+        # Sorted anchor positions, for binary search over scale_points
+        self._positions = tuple(anchor.position for anchor in self.scale_points)
+        self._interp_cache: Dict[int, Dict] = {}  # Quantized dial step -> descriptors
         
         if contrastive_pairs_path:
             self.contrastive_pairs = self._load_pairs(contrastive_pairs_path)
@@ -176,25 +207,39 @@ class LoveHateLikertScale:
         - Modifier swaps (e.g., enjoyable vs tedious)
         - Emotional intensifiers
         """
+        from sklearn.feature_extraction.text import CountVectorizer
+        
         self.verb_pairs = []
         self.modifier_pairs = []
         
-        for pair in self.contrastive_pairs:
-            love = pair['love_response']
-            hate = pair['hate_response']
-            
-            # Extract key differences (simplified - could use NLP)
-            love_words = set(love.lower().split())
-            hate_words = set(hate.lower().split())
-            
-            # Find words that differ
-            love_unique = love_words - hate_words
-            hate_unique = hate_words - love_words
+        if not self.contrastive_pairs:
+            return
+        
+        # One binary bag-of-words row per response (simplified - could use NLP)
+        n_pairs = len(self.contrastive_pairs)
+        vectorizer = CountVectorizer(binary=True, lowercase=True, token_pattern=_TOKEN_PATTERN)
+        try:
+            bags = vectorizer.fit_transform(
+                [pair['love_response'] for pair in self.contrastive_pairs] +
+                [pair['hate_response'] for pair in self.contrastive_pairs]
+            )
+        except ValueError:
+            return  # Every response is empty
+        
+        # +1: word only in the love response, -1: only in the hate response
+        diff = (bags[:n_pairs] - bags[n_pairs:]).tocsr()
+        vocabulary = vectorizer.get_feature_names_out()
+        
+        for i, pair in enumerate(self.contrastive_pairs):
+            columns = diff.indices[diff.indptr[i]:diff.indptr[i + 1]]
+            signs = diff.data[diff.indptr[i]:diff.indptr[i + 1]]
+            love_unique = vocabulary[columns[signs > 0]]
+            hate_unique = vocabulary[columns[signs < 0]]
             
-            if love_unique and hate_unique:
+            if len(love_unique) and len(hate_unique):
                 self.verb_pairs.append({
-                    'love': list(love_unique),
-                    'hate': list(hate_unique),
+                    'love': love_unique.tolist(),
+                    'hate': hate_unique.tolist(),
                     'context': pair['prompt']
                 })
     
@@ -204,35 +249,46 @@ class LoveHateLikertScale:
         
         Returns the closest anchor point with descriptors and examples
         """
-        # Find closest anchor
-        closest_anchor = min(
-            self.scale_points,
-            key=lambda a: abs(a.position - dial_value)
-        )
-        return closest_anchor
+        # Closest anchor is one of the two bracketing the dial; ties go to the lower one
+        idx = bisect_right(self._positions, dial_value)
+        if idx == 0:
+            return self.scale_points[0]
+        if idx == len(self._positions):
+            return self.scale_points[-1]
+        if dial_value - self._positions[idx - 1] <= self._positions[idx] - dial_value:
+            return self.scale_points[idx - 1]
+        return self.scale_points[idx]
     
     def get_interpolated_descriptors(self, dial_value: float) -> Dict:
         """
         Get interpolated descriptors between two anchor points
         
-        For dial values between anchors, blend the descriptors
+        For dial values between anchors, blend the descriptors. Dials in
+        [0, 1] are quantized to 0.01 (slider resolution) and memoized.
         """
-        # Find surrounding anchors
-        lower = None
-        upper = None
+        step = int(round(dial_value * DIAL_STEPS))
+        if not 0 <= step <= DIAL_STEPS:
+            return self._interpolate(dial_value)
         
-        for anchor in self.scale_points:
-            if anchor.position <= dial_value:
-                lower = anchor
-            elif anchor.position > dial_value and upper is None:
-                upper = anchor
-                break
+        cached = self._interp_cache.get(step)
+        if cached is None:
+            cached = self._interp_cache[step] = self._interpolate(step / DIAL_STEPS)
+        # Copy the dict and its one mutable value so callers can't alter the memoized entry
+        return {**cached, "descriptors": list(cached["descriptors"])}
+    
+    def _interpolate(self, dial_value: float) -> Dict:
+        """Uncached get_interpolated_descriptors"""
+        # Find surrounding anchors: last at or below the dial, first above it
+        idx = bisect_right(self._positions, dial_value)
         
-        if lower is None:
+        if idx == 0:
             return self._format_anchor(self.scale_points[0])
-        if upper is None:
+        if idx == len(self._positions):
             return self._format_anchor(self.scale_points[-1])
         
+        lower = self.scale_points[idx - 1]
+        upper = self.scale_points[idx]
+        
         # Calculate interpolation weight
         range_size = upper.position - lower.position
         weight = (dial_value - lower.position) / range_size if range_size > 0 else 0.5
@@ -269,20 +325,7 @@ class LoveHateLikertScale:
         """
         Get human-readable interpretation of dial position
         """
-        if dial_value < 0.15:
-            return "Extremely negative, hostile language. High animosity."
-        elif dial_value < 0.30:
-            return "Strong dislike, resentful tone. Clear negativity."
-        elif dial_value < 0.45:
-            return "Mild dislike, annoyed or frustrated tone."
-        elif dial_value < 0.55:
-            return "Neutral, objective language. No emotional bias."
-        elif dial_value < 0.70:
-            return "Mild affection, appreciative tone. Gentle positivity."
-        elif dial_value < 0.85:
-            return "Strong affection, admiring language. Clear warmth."
-        else:
-            return "Extremely positive, deeply caring language. High warmth."
+        return _INTERPRETATIONS[bisect_right(_INTERPRETATION_THRESHOLDS, dial_value)]
     
     def get_scale_description(self) -> str:
         """
@@ -291,8 +334,8 @@ class LoveHateLikertScale:
         desc = "Love-Hate Semantic Likert Scale (7 points):\n\n"
         for anchor in self.scale_points:
             desc += f"{anchor.position:.0%} - {anchor.label}\n"
-            desc += f"  Key words: {', '.join(anchor.descriptors[:5])}\n"
-            desc += f"  Example: {anchor.examples[0][:80]}...\n\n"
+            desc += f"  Key words: {anchor.descriptors_csv}\n"
+            desc += f"  Example: {anchor.example_preview}...\n\n"
         return desc
     
     def dial_to_likert(self, dial_value: float) -> int:
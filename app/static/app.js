@@ -379,8 +379,8 @@ function connectWebSocket() {
             
             if (data.type === 'turn_generated') {
                 addMessage(data.turn);
-            } else if (data.type === 'dial_updated') {
-                console.log('Dial updated:', data);
+            } else if (data.type === 'dials_updated') {
+                console.log('Dials updated:', data.updates);
             }
         };
 
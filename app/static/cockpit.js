@@ -1,6 +1,8 @@
 // Tea Party Cockpit Control System
 const API_URL = 'http://localhost:8000';
 let ws = null;
+const pendingVideos = {};  // job_id -> handler for the video_ready / video_failed message
+const VIDEO_POLL_MS = 5000;  // GET /api/video/{job_id} interval while the WebSocket is down
 let isRunning = false;
 let currentTurn = 0;
 let maxTurns = 20;
@@ -754,10 +756,10 @@ async function generateTeaPartySceneVideo() {
         const data = await response.json();
         console.log('✅ Scene video generation response:', data);
         
-        if (data.video_url) {
+        const showSceneVideo = (videoUrl) => {
             // Success! Show video player
             const videoPlayer = document.getElementById('scene-video');
-            videoPlayer.src = data.video_url;
+            videoPlayer.src = videoUrl;
             
             playerContainer.style.display = 'block';
             status.innerHTML = `
@@ -774,14 +776,31 @@ async function generateTeaPartySceneVideo() {
             btn.disabled = false;
             
             console.log('✅ Scene video ready!');
+        };
+        
+        if (data.video_url) {
+            showSceneVideo(data.video_url);
         } else if (data.status === 'generating') {
             status.innerHTML = `
                 <div style="padding: 16px; background: #fbbf24; border-radius: 8px; color: #78350f; text-align: center;">
                     <strong>⏳ Video is processing...</strong>
-                    <div style="font-size: 0.9em; margin-top: 4px;">Operation: ${data.operation_name}</div>
+                    <div style="font-size: 0.9em; margin-top: 4px;">Job: ${data.job_id}</div>
                 </div>
             `;
-            btn.disabled = false;
+            // The result is pushed over the WebSocket (or polled) when Veo finishes
+            watchVideoJob(data.job_id, (msg) => {
+                if (msg.type === 'video_ready') {
+                    showSceneVideo(msg.video_url);
+                } else {
+                    status.innerHTML = `
+                        <div style="padding: 16px; background: #ef4444; border-radius: 8px; color: white; text-align: center;">
+                            <strong>❌ Video Generation Failed</strong>
+                            <div style="font-size: 0.9em; margin-top: 4px;">${msg.error}</div>
+                        </div>
+                    `;
+                    btn.disabled = false;
+                }
+            });
         }
         
     } catch (error) {
@@ -871,12 +890,12 @@ async function generateVideosManually() {
         const data = await response.json();
         console.log('✅ Video generation response:', data);
         
-        if (data.video_url) {
+        const showVideo = (videoUrl) => {
             // Success! Add video to the first column
             const videoHtml = `
                 <div class="msg-video" style="margin-top: 15px;">
                     <video controls style="width: 100%; border-radius: 8px;">
-                        <source src="${data.video_url}" type="video/mp4">
+                        <source src="${videoUrl}" type="video/mp4">
                     </video>
                 </div>
             `;
@@ -887,9 +906,21 @@ async function generateVideosManually() {
             btn.disabled = false;
             
             console.log('✅ Video successfully added to UI!');
+        };
+        
+        if (data.video_url) {
+            showVideo(data.video_url);
         } else if (data.status === 'generating') {
-            status.textContent = `⏳ Video is processing... Operation: ${data.operation_name}`;
-            // TODO: Add polling to check status
+            status.textContent = `⏳ Video is processing... Job: ${data.job_id}`;
+            // The result is pushed over the WebSocket (or polled) when Veo finishes
+            watchVideoJob(data.job_id, (msg) => {
+                if (msg.type === 'video_ready') {
+                    showVideo(msg.video_url);
+                } else {
+                    status.textContent = `❌ Video generation failed: ${msg.error}`;
+                    btn.disabled = false;
+                }
+            });
         }
         
     } catch (error) {
@@ -899,6 +930,48 @@ async function generateVideosManually() {
     }
 }
 
+// Hand a finished video job to its handler, once
+function resolveVideoJob(msg) {
+    const handler = pendingVideos[msg.job_id];
+    if (handler) {
+        delete pendingVideos[msg.job_id];
+        handler(msg);
+    }
+}
+
+// Check GET /api/video/{job_id}; returns true once the job is resolved
+async function checkVideoJob(jobId) {
+    try {
+        const response = await fetch(`${API_URL}/api/video/${jobId}`);
+        if (response.status === 404) {
+            resolveVideoJob({ type: 'video_failed', job_id: jobId, error: 'Video job not found' });
+            return true;
+        }
+        const job = await response.json();
+        if (job.type === 'video_ready' || job.type === 'video_failed') {
+            resolveVideoJob(job);
+            return true;
+        }
+    } catch (error) {
+        console.error('Failed to check video job:', error);
+    }
+    return !pendingVideos[jobId];
+}
+
+// Wait for a video job: WebSocket push while connected, polling otherwise
+async function watchVideoJob(jobId, handler) {
+    pendingVideos[jobId] = handler;
+    
+    // Catch up on an outcome broadcast before the handler was registered
+    if (await checkVideoJob(jobId)) return;
+    
+    while (pendingVideos[jobId]) {
+        await new Promise((resolve) => setTimeout(resolve, VIDEO_POLL_MS));
+        if (ws && ws.readyState === WebSocket.OPEN) continue;
+        if (await checkVideoJob(jobId)) return;
+    }
+}
+
 // Clear conversation
 async function clearConversation() {
     try {
@@ -938,6 +1011,8 @@ function connectWebSocket() {
             const data = JSON.parse(event.data);
             if (data.type === 'turn_generated') {
                 addMessage(data.turn);
+            } else if (data.type === 'video_ready' || data.type === 'video_failed') {
+                resolveVideoJob(data);
             }
         };
 
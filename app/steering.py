@@ -2,15 +2,46 @@
 Learned Steering Vectors for Semantic Control
 Uses contrastive pairs to learn directions in embedding space
 """
+import os
+import json
+import hashlib
 import numpy as np
+from collections import OrderedDict
 import pandas as pd
 from typing import Dict, List, Tuple, Optional
 import pickle
 from pathlib import Path
-from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
 
 from .embed import EmbeddingEngine
+from .utils import DIAL_NAMES, dials_to_array
+from . import _dial_kernel
+
+
+def _mean_and_std(embeddings: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Column means and the std over all elements (as np.std on the flattened
+    array), from one column sum and one float64 sum of squares
+    """
+    n_elements = embeddings.size
+    column_sums = embeddings.sum(axis=0, dtype=np.float64)
+    sum_sq = np.einsum('ij,ij->', embeddings, embeddings, dtype=np.float64)
+    mean_all = column_sums.sum() / n_elements
+    variance = max(sum_sq / n_elements - mean_all * mean_all, 0.0)
+    return (column_sums / len(embeddings)).astype(embeddings.dtype), float(np.sqrt(variance))
+
+
+# Steered embeddings kept per (dials, strength, query) in apply_steering
+STEERING_CACHE_SIZE = 1024
+
+# Most recent feedback records kept by AdaptiveSteeringEngine
+FEEDBACK_CAPACITY = 10_000
+FEEDBACK_DTYPE = np.dtype([
+    ('timestamp', 'datetime64[ns]'),
+    ('quality', np.float32),
+    ('dials', np.float32, (len(DIAL_NAMES),)),  # DIAL_NAMES order
+    ('user_id', object)  # Full id, same key as user_preferences (no fixed-width truncation)
+])
 
 
 class SteeringVectorEngine:
@@ -26,6 +57,9 @@ class SteeringVectorEngine:
     Example:
         love_vector = mean(love_embeddings) - mean(hate_embeddings)
         steered_query = query_embedding + 0.8 * love_vector
+    
+    Steered queries are searched in RetrievalEngine's FAISS inner-product
+    index; this class only produces the query vectors.
     """
     
     def __init__(
@@ -40,6 +74,11 @@ class SteeringVectorEngine:
         # Learned steering vectors for each semantic dimension
         self.steering_vectors = {}
         self.vector_stats = {}
+        self._steering_matrix = None  # (len(DIAL_NAMES), dim), built by _get_steering_matrix()
+        self._steering_cache: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()  # LRU over apply_steering
+        
+        # Compile the steering kernel now rather than on the first query
+        _dial_kernel.warmup_steering()
         
     def learn_steering_vectors(
         self,
@@ -80,10 +119,16 @@ class SteeringVectorEngine:
         
         print(f"📊 Loaded {len(pairs['positive'])} contrastive pairs")
         
-        # Embed all responses
+        # Embed all responses in one call, then split back into the two sides
         print("🔢 Embedding responses...")
-        positive_embeddings = self.embedding_engine.embed(pairs['positive'])
-        negative_embeddings = self.embedding_engine.embed(pairs['negative'])
+        n_positive = len(pairs['positive'])
+        all_embeddings = self.embedding_engine.embed(
+            pairs['positive'] + pairs['negative'], batch_size=64, use_cache=False
+        )
+        # float32 throughout: the means, SVD and stored vectors stay single precision
+        all_embeddings = np.ascontiguousarray(all_embeddings, dtype=np.float32)
+        positive_embeddings = all_embeddings[:n_positive]
+        negative_embeddings = all_embeddings[n_positive:]
         
         # Learn primary steering vector (love/hate axis)
         love_vector = self._compute_steering_vector(
@@ -102,6 +147,9 @@ class SteeringVectorEngine:
             pairs
         )
         
+        self._steering_matrix = None
+        self._steering_cache.clear()
+        
         # Save vectors
         self._save_vectors()
         
@@ -120,21 +168,17 @@ class SteeringVectorEngine:
     
     def _load_love_hate_format(self, df: pd.DataFrame) -> Dict[str, List[str]]:
         """Load pairs from love/hate response format"""
-        # Load all valid pairs
-        direct_pairs = []
-        for _, row in df.iterrows():
-            love = str(row.get('love_response', '')).strip()
-            hate = str(row.get('hate_response', '')).strip()
-            
-            # Keep pairs that are not empty and not too long
-            if love and hate and len(love) > 10 and len(hate) > 10 and len(love) < 500 and len(hate) < 500:
-                direct_pairs.append((love, hate))
+        love = df['love_response'].fillna('').astype(str).str.strip()
+        hate = df['hate_response'].fillna('').astype(str).str.strip()
         
-        print(f"  📝 Loaded {len(direct_pairs)} valid pairs from CSV")
+        # Keep pairs that are not empty and not too long
+        valid = love.str.len().between(11, 499) & hate.str.len().between(11, 499)
+        
+        print(f"  📝 Loaded {int(valid.sum())} valid pairs from CSV")
         
         return {
-            'positive': [p[0] for p in direct_pairs],
-            'negative': [p[1] for p in direct_pairs]
+            'positive': love[valid].tolist(),
+            'negative': hate[valid].tolist()
         }
     
     def _load_labeled_format(self, df: pd.DataFrame) -> Dict[str, List[str]]:
@@ -161,22 +205,23 @@ class SteeringVectorEngine:
         
         steering_vector = mean(positive) - mean(negative)
         """
-        # Compute means
-        positive_mean = np.mean(positive_embeddings, axis=0)
-        negative_mean = np.mean(negative_embeddings, axis=0)
+        # Means and spread from one sum and one sum of squares per side
+        positive_mean, positive_std = _mean_and_std(positive_embeddings)
+        negative_mean, negative_std = _mean_and_std(negative_embeddings)
         
         # Steering vector = direction from negative to positive
         vector = positive_mean - negative_mean
+        magnitude = float(np.sqrt(vector @ vector))
         
         # Normalize (unit vector)
-        vector_norm = vector / (np.linalg.norm(vector) + 1e-8)
+        vector_norm = vector / np.float32(magnitude + 1e-8)
         
-        # Store statistics
+        # Store statistics (separation is the same distance as magnitude)
         self.vector_stats[name] = {
-            'magnitude': float(np.linalg.norm(vector)),
-            'positive_std': float(np.std(positive_embeddings)),
-            'negative_std': float(np.std(negative_embeddings)),
-            'separation': float(np.linalg.norm(positive_mean - negative_mean))
+            'magnitude': magnitude,
+            'positive_std': positive_std,
+            'negative_std': negative_std,
+            'separation': magnitude
         }
         
         print(f"  ✓ {name}: magnitude={self.vector_stats[name]['magnitude']:.3f}, "
@@ -204,10 +249,17 @@ class SteeringVectorEngine:
             print(f"  ⚠️  Only {len(differences)} pairs - skipping PCA dimension derivation")
             return
         
-        # Apply PCA to find principal directions of variation
+        # PCA via thin SVD of the centered differences: no covariance matrix,
+        # and only min(N, D) singular vectors are computed
         n_components = min(5, len(differences))
-        pca = PCA(n_components=n_components)
-        pca.fit(differences)
+        centered = differences - differences.mean(axis=0, keepdims=True)
+        U, S, Vt = np.linalg.svd(centered, full_matrices=False)
+        
+        # Same sign convention as sklearn's PCA (svd_flip), so learned vectors keep their direction
+        signs = np.sign(U[np.argmax(np.abs(U[:, :n_components]), axis=0), np.arange(n_components)])
+        components = Vt[:n_components] * signs[:, None]
+        variance = S ** 2
+        variance_ratio = variance[:n_components] / variance.sum()
         
         # Map principal components to semantic dimensions
         # Based on variance explained
@@ -224,14 +276,13 @@ class SteeringVectorEngine:
                 continue  # Love already computed directly
             
             if dimension not in self.steering_vectors:
-                vector = pca.components_[pc_idx]
-                # Normalize
-                vector = vector / (np.linalg.norm(vector) + 1e-8)
+                # Rows of Vt are already unit vectors; no normalization needed
+                vector = components[pc_idx].astype(np.float32, copy=False)
                 self.steering_vectors[dimension] = vector
                 
                 self.vector_stats[dimension] = {
-                    'magnitude': float(np.linalg.norm(vector)),
-                    'variance_explained': float(pca.explained_variance_ratio_[pc_idx]),
+                    'magnitude': float(np.sqrt(vector @ vector)),
+                    'variance_explained': float(variance_ratio[pc_idx]),
                     'method': 'pca_derived'
                 }
                 
@@ -242,7 +293,8 @@ class SteeringVectorEngine:
         self,
         query_embedding: np.ndarray,
         dials: Dict[str, float],
-        strength: float = 1.0
+        strength: float = 1.0,
+        out: Optional[np.ndarray] = None
     ) -> np.ndarray:
         """
         Apply learned steering vectors to query embedding
@@ -251,23 +303,112 @@ class SteeringVectorEngine:
             query_embedding: Original query embedding
             dials: Dictionary of dial values (0-1) for each dimension
             strength: Overall steering strength (default 1.0)
+            out: Optional float32 (dim,) buffer to write the result into
         
         Returns:
             Steered query embedding
         """
-        steered = query_embedding.copy()
+        if not self.steering_vectors:
+            return np.divide(query_embedding, np.linalg.norm(query_embedding) + 1e-8, out=out)
+        
+        # Missing dials default to neutral 0.5, i.e. zero weight, as before
+        dials_vec = dials_to_array(dials)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        
+        # Repeated query + dial setting: reuse the steered vector
+        key = (dials_vec.tobytes(), float(strength), hashlib.blake2b(query.tobytes(), digest_size=8).digest())
+        cached = self._steering_cache.get(key)
+        if cached is not None:
+            self._steering_cache.move_to_end(key)
+            if out is None:
+                return cached.copy()
+            np.copyto(out, cached)
+            return out
+        
+        if _dial_kernel.NUMBA_AVAILABLE:
+            # Weighting, matvec and normalize fused into one compiled pass
+            steered = _dial_kernel.steer_query(
+                query, self._get_steering_matrix(), dials_vec, float(strength),
+                np.empty_like(query) if out is None else out
+            )
+        else:
+            # The whole blend is one (n_dials,) @ (n_dials, dim) product
+            steered = self.apply_combined(query, self.combine(dials_vec, strength), out=out)
         
-        for dimension, value in dials.items():
-            if dimension in self.steering_vectors:
-                # Normalize dial value to [-1, 1] range (0.5 = neutral)
-                dial_strength = (value - 0.5) * 2.0 * strength
-                
-                # Add steering vector weighted by dial
-                steered += dial_strength * self.steering_vectors[dimension]
+        # Own copy: `out` belongs to the caller and may be overwritten
+        self._steering_cache[key] = steered.copy()
+        if len(self._steering_cache) > STEERING_CACHE_SIZE:
+            self._steering_cache.popitem(last=False)
+        return steered
+    
+    def apply_steering_batch(
+        self,
+        query_embeddings: np.ndarray,
+        dials: Dict[str, float],
+        strength: float = 1.0
+    ) -> np.ndarray:
+        """
+        Apply one dial setting to a batch of query embeddings
         
-        # Re-normalize (important for cosine similarity)
-        steered = steered / (np.linalg.norm(steered) + 1e-8)
+        The combined offset is computed once and broadcast-added to every row,
+        then all rows are normalized together.
         
+        Args:
+            query_embeddings: (n, dim) query embeddings
+            dials: Dictionary of dial values (0-1) for each dimension
+            strength: Overall steering strength (default 1.0)
+        
+        Returns:
+            float32 (n, dim) steered, L2-normalized embeddings
+        """
+        steered = np.array(query_embeddings, dtype=np.float32, ndmin=2)
+        if self.steering_vectors:
+            steered += self.combine(dials_to_array(dials), strength)
+        steered /= np.linalg.norm(steered, axis=1, keepdims=True) + 1e-8
+        return steered
+    
+    def combine(self, dials_vec: np.ndarray, strength: float = 1.0) -> np.ndarray:
+        """
+        Combine all steering vectors for a dial setting into one offset
+        
+        Same weighting as apply_steering(), as a single (n_dials,) @ (n_dials, dim)
+        product. Compute once per request and pass to apply_combined().
+        
+        Args:
+            dials_vec: Dial values (0-1) in DIAL_NAMES order
+            strength: Overall steering strength (default 1.0)
+        
+        Returns:
+            float32 steering offset of shape (dim,)
+        """
+        # Normalize dial values to [-1, 1] range (0.5 = neutral)
+        weights = (np.asarray(dials_vec, dtype=np.float32) - 0.5) * (2.0 * strength)
+        return weights @ self._get_steering_matrix()
+    
+    def _get_steering_matrix(self) -> np.ndarray:
+        """Steering vectors as a C-contiguous float32 (len(DIAL_NAMES), dim) matrix"""
+        if self._steering_matrix is None:
+            dim = next(iter(self.steering_vectors.values())).shape[0]
+            # Dimensions without a learned vector contribute nothing
+            self._steering_matrix = np.ascontiguousarray(np.stack([
+                self.steering_vectors.get(name, np.zeros(dim))
+                for name in DIAL_NAMES
+            ]), dtype=np.float32)
+        return self._steering_matrix
+    
+    def apply_combined(
+        self,
+        query_embedding: np.ndarray,
+        combined_vector: np.ndarray,
+        out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Apply a combine() offset to a query embedding and re-normalize
+        
+        With `out`, the result is written there instead of a new array.
+        """
+        steered = np.add(query_embedding, combined_vector, out=out)
+        steered /= np.linalg.norm(steered) + 1e-8
         return steered
     
     def get_vector_info(self) -> Dict:
@@ -279,27 +420,53 @@ class SteeringVectorEngine:
         }
     
     def _save_vectors(self):
-        """Save learned vectors to disk"""
-        save_path = self.cache_path / "steering_vectors.pkl"
-        with open(save_path, 'wb') as f:
-            pickle.dump({
-                'vectors': self.steering_vectors,
-                'stats': self.vector_stats
-            }, f)
+        """
+        Save learned vectors to disk
+        
+        steering_vectors.npy holds the vectors as rows of one float32 matrix;
+        steering_vectors.json holds their names (row order) and stats.
+        
+        Both are written beside their targets and renamed over them: loaded
+        vectors are views of the memory-mapped .npy (here and in other
+        workers), and truncating it in place would make them raise SIGBUS.
+        """
+        names = list(self.steering_vectors)
+        matrix = np.stack([self.steering_vectors[name] for name in names]).astype(np.float32)
+        with open(self.cache_path / "steering_vectors.npy.tmp", 'wb') as f:
+            np.save(f, matrix)
+        
+        save_path = self.cache_path / "steering_vectors.json"
+        (self.cache_path / "steering_vectors.json.tmp").write_text(
+            json.dumps({'names': names, 'stats': self.vector_stats})
+        )
+        
+        # .json last: its presence marks a complete save
+        for name in ("steering_vectors.npy", "steering_vectors.json"):
+            os.replace(self.cache_path / (name + ".tmp"), self.cache_path / name)
         print(f"💾 Saved steering vectors to {save_path}")
     
     def load_vectors(self) -> bool:
         """Load previously learned vectors"""
-        load_path = self.cache_path / "steering_vectors.pkl"
+        meta_path = self.cache_path / "steering_vectors.json"
+        legacy_path = self.cache_path / "steering_vectors.pkl"
         
-        if not load_path.exists():
+        if not meta_path.exists() and not legacy_path.exists():
             return False
         
         try:
-            with open(load_path, 'rb') as f:
-                data = pickle.load(f)
-                self.steering_vectors = data['vectors']
+            if meta_path.exists():
+                data = json.loads(meta_path.read_text())
+                # Memory-mapped: pages are shared between server workers
+                matrix = np.load(self.cache_path / "steering_vectors.npy", mmap_mode='r')
+                self.steering_vectors = {name: matrix[i] for i, name in enumerate(data['names'])}
                 self.vector_stats = data['stats']
+            else:
+                with open(legacy_path, 'rb') as f:
+                    data = pickle.load(f)
+                    self.steering_vectors = data['vectors']
+                    self.vector_stats = data['stats']
+            self._steering_matrix = None
+            self._steering_cache.clear()
             
             print(f"✅ Loaded {len(self.steering_vectors)} steering vectors from cache")
             return True
@@ -320,9 +487,19 @@ class AdaptiveSteeringEngine(SteeringVectorEngine):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.feedback_history = []
+        # Fixed-size ring of feedback records, oldest overwritten first
+        self._feedback_ring = np.zeros(FEEDBACK_CAPACITY, dtype=FEEDBACK_DTYPE)
+        self._feedback_count = 0
         self.user_preferences = {}
     
+    @property
+    def feedback_history(self) -> np.ndarray:
+        """Recorded feedback (up to FEEDBACK_CAPACITY most recent), oldest first, as a structured array"""
+        if self._feedback_count <= FEEDBACK_CAPACITY:
+            return self._feedback_ring[:self._feedback_count]
+        # Wrapped: the oldest record sits at the next write slot
+        return np.roll(self._feedback_ring, -(self._feedback_count % FEEDBACK_CAPACITY))
+    
     def record_feedback(
         self,
         query: str,
@@ -338,34 +515,36 @@ class AdaptiveSteeringEngine(SteeringVectorEngine):
         2. Periodically retrain steering vectors
         3. Personalize per user
         """
-        self.feedback_history.append({
-            'query': query,
-            'dials': dials,
-            'quality': result_quality,
-            'user_id': user_id,
-            'timestamp': pd.Timestamp.now()
-        })
-        
-        # Update user preferences
+        dials_vec = dials_to_array(dials)
+        self._feedback_ring[self._feedback_count % FEEDBACK_CAPACITY] = (
+            np.datetime64('now'), result_quality, dials_vec, user_id or ''
+        )
+        self._feedback_count += 1
+        
+        # Update user preferences: running sums in DIAL_NAMES order, counted
+        # per dimension so dials the client didn't send stay out of the mean
         if user_id:
             if user_id not in self.user_preferences:
-                self.user_preferences[user_id] = {'dial_avg': {}, 'count': 0}
-            
-            # Track average dial preferences per user
-            for dim, val in dials.items():
-                if dim not in self.user_preferences[user_id]['dial_avg']:
-                    self.user_preferences[user_id]['dial_avg'][dim] = 0
-                
-                # Running average
-                n = self.user_preferences[user_id]['count']
-                curr_avg = self.user_preferences[user_id]['dial_avg'][dim]
-                self.user_preferences[user_id]['dial_avg'][dim] = \
-                    (curr_avg * n + val) / (n + 1)
+                self.user_preferences[user_id] = {
+                    'dial_sum': np.zeros(len(DIAL_NAMES), dtype=np.float64),
+                    'dial_count': np.zeros(len(DIAL_NAMES), dtype=np.int64),
+                    'count': 0
+                }
             
-            self.user_preferences[user_id]['count'] += 1
+            prefs = self.user_preferences[user_id]
+            sent = np.fromiter((name in dials for name in DIAL_NAMES), dtype=bool, count=len(DIAL_NAMES))
+            prefs['dial_sum'][sent] += dials_vec[sent]
+            prefs['dial_count'] += sent
+            prefs['count'] += 1
     
     def get_user_defaults(self, user_id: str) -> Dict[str, float]:
-        """Get learned default dials for a user"""
+        """Get learned default dials for a user (only the dials they have sent)"""
         if user_id in self.user_preferences:
-            return self.user_preferences[user_id]['dial_avg']
+            prefs = self.user_preferences[user_id]
+            counts = prefs['dial_count']
+            return {
+                name: float(prefs['dial_sum'][i] / counts[i])
+                for i, name in enumerate(DIAL_NAMES)
+                if counts[i]
+            }
         return {'love': 0.5, 'commitment': 0.5, 'belonging': 0.5, 'trust': 0.5, 'growth': 0.5}
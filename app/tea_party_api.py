@@ -4,25 +4,39 @@ Tea Party API - FastAPI Backend
 WebSocket-enabled API for real-time multi-dimensional steering
 and conversation generation with Veo 3.1 video.
 """
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, BackgroundTasks, Body
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from fastapi.responses import FileResponse, ORJSONResponse, Response
+from pydantic import BaseModel
+from typing import Awaitable, Callable, List, Dict, Optional, Set, Tuple
 import asyncio
-import json
+import orjson
+import time
+import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 from app.tea_party_conversation import TeaPartyConversationEngine
 from app.tea_party_characters import CHARACTERS
 from app.multi_dimensional_scale import MultiDimensionalScale
 from app.semantic_dial_validator import SemanticDialValidator, TEA_PARTY_DESCRIPTORS
+from app._threads import to_thread_fast
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup()
+    yield
+    await shutdown()
+
 
 app = FastAPI(
     title="Tea Party Sentiment-Controlled Conversation API",
     description="Multi-dimensional steering vectors for character conversations with Veo 3.1 video",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Mount static files
@@ -48,18 +62,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Window over which WebSocket update_dial messages are coalesced
+DIAL_DEBOUNCE_S = 0.03
+
 # Global conversation engine and validator
 conversation_engine: Optional[TeaPartyConversationEngine] = None
 semantic_validator: Optional[SemanticDialValidator] = None
 
+# Open /ws/tea-party connections, for broadcast()
+ws_clients: Set[WebSocket] = set()
 
-# Pydantic Models
-class DialUpdate(BaseModel):
-    character_id: str
-    dimension: str = Field(..., pattern="^(theory_of_mind|harmfulness|irony|self_other)$")
-    value: float = Field(..., ge=0.0, le=1.0)
+# Latest state of recent video jobs, for GET /api/video/{job_id}
+VIDEO_JOBS_SIZE = 256
+video_jobs: Dict[str, Dict] = {}
 
 
+# Dimensions accepted by /api/dial
+_DIMENSIONS = frozenset(MultiDimensionalScale.DIMENSIONS)
+
+
+# Pydantic Models
 class ConversationRequest(BaseModel):
     topic: str = "tea and pastries"
     character_order: Optional[List[str]] = None
@@ -79,11 +101,75 @@ class VideoGenerationRequest(BaseModel):
     dialogue: str
 
 
-# Startup/Shutdown
-@app.on_event("startup")
+async def _send(websocket: WebSocket, payload: Dict):
+    """Send a JSON text frame encoded with orjson (browsers JSON.parse the text)"""
+    await websocket.send_text(orjson.dumps(payload).decode())
+
+
+async def broadcast(payload: Dict):
+    """Serialize `payload` once and send it to every connected WebSocket client"""
+    if not ws_clients:
+        return
+    text = orjson.dumps(payload).decode()
+    # Disconnected clients fail here and are removed by their own handler
+    await asyncio.gather(
+        *(client.send_text(text) for client in list(ws_clients)),
+        return_exceptions=True
+    )
+
+
+def _store_video_job(job_id: str, payload: Dict):
+    """Record a job's latest state, dropping the oldest jobs past VIDEO_JOBS_SIZE"""
+    video_jobs.pop(job_id, None)
+    video_jobs[job_id] = payload
+    while len(video_jobs) > VIDEO_JOBS_SIZE:
+        # Dicts keep insertion order: drop the oldest entry
+        del video_jobs[next(iter(video_jobs))]
+
+
+def _start_video(background_tasks: BackgroundTasks, info: Dict, generate: Callable[[], Awaitable[Dict]]) -> str:
+    """Register a pending video job and run it after the response is sent; returns its job_id"""
+    job_id = uuid.uuid4().hex
+    _store_video_job(job_id, {"type": "video_pending", "job_id": job_id, **info})
+    background_tasks.add_task(_await_video, job_id, info, generate)
+    return job_id
+
+
+async def _await_video(job_id: str, info: Dict, generate: Callable[[], Awaitable[Dict]]):
+    """Run a Veo generation in the background, store the outcome and push it to all WebSocket clients"""
+    try:
+        result = await generate()
+    except Exception as e:
+        result = {"status": "failed", "error": str(e)}
+    
+    if result.get('video_url'):
+        print(f"✅ Video {job_id} ready: {result['video_url']}")
+        payload = {
+            "type": "video_ready",
+            "job_id": job_id,
+            "video_url": result['video_url'],
+            "operation_name": result.get('operation_name'),
+            **info
+        }
+    else:
+        print(f"❌ Video {job_id} failed: {result.get('error')}")
+        payload = {
+            "type": "video_failed",
+            "job_id": job_id,
+            "error": result.get('error', "Video generation failed"),
+            **info
+        }
+    
+    # Stored first, so clients without a WebSocket can poll for it
+    _store_video_job(job_id, payload)
+    await broadcast(payload)
+
+
+# Startup/Shutdown (run by lifespan)
 async def startup():
     global conversation_engine, semantic_validator
     print("🫖 Starting Tea Party API...")
+    print(f"   Event loop: {type(asyncio.get_running_loop()).__module__}")
     try:
         conversation_engine = TeaPartyConversationEngine()
         print("✅ Conversation engine initialized")
@@ -92,6 +178,9 @@ async def startup():
         try:
             semantic_validator = SemanticDialValidator()
             print("✅ Semantic validator initialized")
+            if semantic_validator.model:
+                # Near-duplicate turns reuse cached LLM responses
+                conversation_engine.set_cache_encoder(semantic_validator.embed)
         except Exception as e:
             print(f"⚠️ Semantic validator unavailable: {e}")
             semantic_validator = None
@@ -100,7 +189,6 @@ async def startup():
         raise
 
 
-@app.on_event("shutdown")
 async def shutdown():
     print("👋 Shutting down Tea Party API...")
 
@@ -139,11 +227,23 @@ async def classic_ui():
         return {"error": "Classic UI not found"}
 
 
+# /health timestamp, reformatted at most once per second
+_health_timestamp = ("", 0.0)
+
+
+def _cached_timestamp() -> str:
+    global _health_timestamp
+    now = time.monotonic()
+    if now - _health_timestamp[1] >= 1.0:
+        _health_timestamp = (datetime.now().isoformat(), now)
+    return _health_timestamp[0]
+
+
 @app.get("/health")
 async def health():
     return {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": _cached_timestamp(),
         "engine_ready": conversation_engine is not None
     }
 
@@ -175,28 +275,54 @@ async def get_character(character_id: str):
 
 
 @app.post("/api/dial")
-async def update_dial(dial: DialUpdate):
-    """Update a character's dial value"""
+async def update_dial(body: Dict = Body(...)):
+    """
+    Update a character's dial value
+    
+    Body: {"character_id": "...", "dimension": "...", "value": 0.5}. Sliders
+    call this many times per drag, so the body is checked by hand rather
+    than through a Pydantic model.
+    """
     if not conversation_engine:
         raise HTTPException(status_code=500, detail="Conversation engine not initialized")
     
     try:
-        conversation_engine.update_character_dial(
-            dial.character_id,
-            dial.dimension,
-            dial.value
-        )
+        character_id = str(body["character_id"])
+        dimension = body["dimension"]
+        if not isinstance(dimension, str):
+            raise TypeError("dimension must be a string")
+        value = float(body["value"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid dial update: {e}")
+    if dimension not in _DIMENSIONS:
+        raise HTTPException(status_code=422, detail=f"Unknown dimension: {dimension}")
+    if not 0.0 <= value <= 1.0:
+        raise HTTPException(status_code=422, detail="Dial value must be between 0.0 and 1.0")
+    
+    try:
+        conversation_engine.update_character_dial(character_id, dimension, value)
         
         # Get updated state
         state = conversation_engine.character_manager.get_character(
-            dial.character_id
+            character_id
         ).get_current_state()
         
+        # Keep every open UI in sync with the REST change
+        await broadcast({
+            "type": "dials_updated",
+            "updates": [{
+                "character_id": character_id,
+                "dimension": dimension,
+                "value": value,
+                "state": state
+            }]
+        })
+        
         return {
             "status": "updated",
-            "character_id": dial.character_id,
-            "dimension": dial.dimension,
-            "value": dial.value,
+            "character_id": character_id,
+            "dimension": dimension,
+            "value": value,
             "current_state": state
         }
     except ValueError as e:
@@ -244,7 +370,9 @@ async def generate_single_turn(request: SingleTurnRequest):
     turn_dict = turn.to_dict()
     if semantic_validator:
         try:
-            validation_scores = semantic_validator.validate_steering_effectiveness(
+            # Model inference; run it off the event loop
+            validation_scores = await to_thread_fast(
+                semantic_validator.validate_steering_effectiveness,
                 dial_values=turn.dial_values,
                 response=turn.text,
                 dimension_descriptors=TEA_PARTY_DESCRIPTORS
@@ -285,8 +413,14 @@ async def clear_history():
 
 
 @app.post("/api/video/generate")
-async def generate_video(request: VideoGenerationRequest):
-    """Generate a VEO video for a character's dialogue"""
+async def generate_video(request: VideoGenerationRequest, background_tasks: BackgroundTasks):
+    """
+    Start a VEO video for a character's dialogue
+    
+    Returns a job_id right away; the result is broadcast on /ws/tea-party
+    as video_ready / video_failed with the same job_id, and can be polled
+    at GET /api/video/{job_id}.
+    """
     if not conversation_engine:
         raise HTTPException(status_code=500, detail="Conversation engine not initialized")
     
@@ -297,20 +431,21 @@ async def generate_video(request: VideoGenerationRequest):
         # Get character info
         char_info = conversation_engine.character_manager.get_character_info(request.character_id)
         
-        # Generate video using VEO
-        video_result = await conversation_engine.veo_generator.generate_character_video(
-            character_name=char_info['character_name'],
-            character_appearance=char_info['appearance'],
-            dialogue=request.dialogue,
-            scene_description="elegant tea party with ornate decorations and fine china"
+        # Generate video using VEO after the response is sent
+        job_id = _start_video(
+            background_tasks,
+            {"character_id": request.character_id, "character_name": char_info['character_name']},
+            lambda: conversation_engine.veo_generator.generate_character_video(
+                character_name=char_info['character_name'],
+                character_appearance=char_info['appearance'],
+                dialogue=request.dialogue,
+                scene_description="elegant tea party with ornate decorations and fine china"
+            )
         )
         
-        print(f"✅ Video generated: {video_result.get('video_url', 'Processing...')}")
-        
         return {
-            "status": "success" if video_result.get('video_url') else "generating",
-            "video_url": video_result.get('video_url'),
-            "operation_name": video_result.get('operation_name'),
+            "status": "generating",
+            "job_id": job_id,
             "character_name": char_info['character_name']
         }
         
@@ -320,8 +455,14 @@ async def generate_video(request: VideoGenerationRequest):
 
 
 @app.post("/api/video/conversation")
-async def generate_conversation_video(request: dict):
-    """Generate a conversation video with all 5 characters"""
+async def generate_conversation_video(request: dict, background_tasks: BackgroundTasks):
+    """
+    Start a conversation video with all 5 characters
+    
+    Returns a job_id right away; the result is broadcast on /ws/tea-party
+    as video_ready / video_failed with the same job_id, and can be polled
+    at GET /api/video/{job_id}.
+    """
     if not conversation_engine:
         raise HTTPException(status_code=500, detail="Conversation engine not initialized")
     
@@ -342,21 +483,23 @@ async def generate_conversation_video(request: dict):
                 'appearance': char_info['appearance']
             })
         
-        # Generate conversation video
-        video_result = await conversation_engine.veo_generator.generate_conversation_video(
-            character_responses=character_responses,
-            reference_image_path=reference_image,
-            duration_seconds=30
+        # Generate conversation video after the response is sent
+        characters = [r['character_name'] for r in character_responses]
+        job_id = _start_video(
+            background_tasks,
+            {"video_type": "conversation", "characters": characters},
+            lambda: conversation_engine.veo_generator.generate_conversation_video(
+                character_responses=character_responses,
+                reference_image_path=reference_image,
+                duration_seconds=30
+            )
         )
         
-        print(f"✅ Conversation video generated: {video_result.get('video_url', 'Processing...')}")
-        
         return {
-            "status": "success" if video_result.get('video_url') else "generating",
-            "video_url": video_result.get('video_url'),
-            "operation_name": video_result.get('operation_name'),
+            "status": "generating",
+            "job_id": job_id,
             "type": "conversation",
-            "characters": [r['character_name'] for r in character_responses]
+            "characters": characters
         }
         
     except Exception as e:
@@ -364,6 +507,20 @@ async def generate_conversation_video(request: dict):
         raise HTTPException(status_code=500, detail=f"Conversation video generation failed: {str(e)}")
 
 
+@app.get("/api/video/{job_id}")
+async def get_video_job(job_id: str):
+    """
+    Latest state of a video job: video_pending, video_ready or video_failed
+    
+    Same payload as the /ws/tea-party broadcast, for clients without an
+    open WebSocket or that registered after the broadcast went out.
+    """
+    job = video_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown video job: {job_id}")
+    return job
+
+
 @app.post("/api/scene/opening")
 async def generate_opening():
     """Generate opening establishing shot"""
@@ -374,9 +531,8 @@ async def generate_opening():
     return result
 
 
-@app.get("/api/dimensions")
-async def get_dimensions():
-    """Get information about all steering dimensions"""
+def _build_dimensions_payload() -> bytes:
+    """Serialized /api/dimensions body; depends only on the static dimension definitions"""
     scale = MultiDimensionalScale()
     
     dimensions_info = []
@@ -387,16 +543,25 @@ async def get_dimensions():
             "name": desc.name,
             "low_label": desc.low_label,
             "high_label": desc.high_label,
-            "low_descriptors": desc.low_descriptors[:3],
-            "high_descriptors": desc.high_descriptors[:3],
+            "low_descriptors": desc.low_top3,
+            "high_descriptors": desc.high_top3,
             "example_low": desc.example_pairs[0][0] if desc.example_pairs else "",
             "example_high": desc.example_pairs[0][1] if desc.example_pairs else ""
         })
     
-    return {
+    return orjson.dumps({
         "dimensions": dimensions_info,
         "count": len(dimensions_info)
-    }
+    })
+
+
+_DIMENSIONS_PAYLOAD = _build_dimensions_payload()
+
+
+@app.get("/api/dimensions")
+async def get_dimensions():
+    """Get information about all steering dimensions"""
+    return Response(content=_DIMENSIONS_PAYLOAD, media_type="application/json")
 
 
 # WebSocket for real-time updates
@@ -412,46 +577,88 @@ async def websocket_endpoint(websocket: WebSocket):
     - {"action": "get_states"}
     
     Server messages:
-    - {"type": "dial_updated", "character_id": "...", "state": {...}}
+    - {"type": "dials_updated", "updates": [{"character_id": "...", "dimension": "...", "value": 0.5, "state": {...}}]}
     - {"type": "turn_generated", "turn": {...}}
     - {"type": "states", "characters": [...]}
+    - {"type": "video_ready" | "video_failed", "job_id": "...", ...}
     - {"type": "error", "message": "..."}
+    
+    dials_updated, topic_updated and video_* go to every connected client.
     """
     await websocket.accept()
     print("🔌 WebSocket client connected")
     
+    # Slider drags send many update_dial messages; only the latest value per
+    # (character_id, dimension) is applied, once per DIAL_DEBOUNCE_S window
+    pending_dials: Dict[Tuple[str, str], float] = {}
+    dials_changed = asyncio.Event()
+    
+    async def flush_dials():
+        """Apply the pending dial values and broadcast them in one message"""
+        if not pending_dials:
+            return
+        batch = list(pending_dials.items())
+        pending_dials.clear()
+        
+        updates = []
+        for (character_id, dimension), value in batch:
+            try:
+                conversation_engine.update_character_dial(character_id, dimension, value)
+                state = conversation_engine.character_manager.get_character(
+                    character_id
+                ).get_current_state()
+                updates.append({
+                    "character_id": character_id,
+                    "dimension": dimension,
+                    "value": value,
+                    "state": state
+                })
+            except Exception as e:
+                await _send(websocket, {
+                    "type": "error",
+                    "message": str(e)
+                })
+        
+        if updates:
+            await broadcast({
+                "type": "dials_updated",
+                "updates": updates
+            })
+    
+    async def dial_flush_loop():
+        try:
+            while True:
+                await dials_changed.wait()
+                await asyncio.sleep(DIAL_DEBOUNCE_S)
+                dials_changed.clear()
+                await flush_dials()
+        except (WebSocketDisconnect, RuntimeError):
+            # Socket closed mid-send; the receive loop handles the disconnect
+            pass
+    
+    flusher = asyncio.create_task(dial_flush_loop())
+    ws_clients.add(websocket)
+    
+    # Bound once; the loop below runs per message
+    recv = websocket.receive_text
+    loads = orjson.loads
+    
     try:
         while True:
             # Receive message
-            data = await websocket.receive_json()
+            data = loads(await recv())
             action = data.get("action")
             
             if action == "update_dial":
-                # Update character dial
-                character_id = data.get("character_id")
-                dimension = data.get("dimension")
-                value = data.get("value")
-                
-                try:
-                    conversation_engine.update_character_dial(character_id, dimension, value)
-                    state = conversation_engine.character_manager.get_character(
-                        character_id
-                    ).get_current_state()
-                    
-                    await websocket.send_json({
-                        "type": "dial_updated",
-                        "character_id": character_id,
-                        "dimension": dimension,
-                        "value": value,
-                        "state": state
-                    })
-                except Exception as e:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": str(e)
-                    })
+                # Queue the dial change; dial_flush_loop applies it
+                pending_dials[(data.get("character_id"), data.get("dimension"))] = data.get("value")
+                dials_changed.set()
+                continue
+            
+            # Other actions see every dial change sent before them
+            await flush_dials()
             
-            elif action == "generate_turn":
+            if action == "generate_turn":
                 # Generate character response
                 character_id = data.get("character_id")
                 context = data.get("context")
@@ -464,12 +671,12 @@ async def websocket_endpoint(websocket: WebSocket):
                         generate_video=generate_video
                     )
                     
-                    await websocket.send_json({
+                    await _send(websocket, {
                         "type": "turn_generated",
                         "turn": turn.to_dict()
                     })
                 except Exception as e:
-                    await websocket.send_json({
+                    await _send(websocket, {
                         "type": "error",
                         "message": str(e)
                     })
@@ -479,7 +686,7 @@ async def websocket_endpoint(websocket: WebSocket):
                 topic = data.get("topic", "tea and pastries")
                 conversation_engine.set_topic(topic)
                 
-                await websocket.send_json({
+                await broadcast({
                     "type": "topic_updated",
                     "topic": topic
                 })
@@ -488,13 +695,13 @@ async def websocket_endpoint(websocket: WebSocket):
                 # Get all character states
                 states = conversation_engine.get_all_character_states()
                 
-                await websocket.send_json({
+                await _send(websocket, {
                     "type": "states",
                     "characters": states
                 })
             
             else:
-                await websocket.send_json({
+                await _send(websocket, {
                     "type": "error",
                     "message": f"Unknown action: {action}"
                 })
@@ -504,15 +711,28 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         print(f"❌ WebSocket error: {e}")
         try:
-            await websocket.send_json({
+            await _send(websocket, {
                 "type": "error",
                 "message": str(e)
             })
         except:
             pass
         await websocket.close()
+    finally:
+        ws_clients.discard(websocket)
+        flusher.cancel()
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    
+    # libuv event loop and C HTTP parser (both ship with uvicorn[standard])
+    uvicorn.run(
+        "app.tea_party_api:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=bool(os.getenv("DEV")),
+        loop="uvloop",
+        http="httptools",
+        ws="websockets"
+    )
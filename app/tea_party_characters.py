@@ -4,8 +4,10 @@ Tea Party Character Definitions
 Based on the 5 characters in the tea party image.
 Each character has a unique personality and visual description.
 """
-from typing import Dict, List
-from app.multi_dimensional_scale import MultiDimensionalScale, CharacterSteeringProfile
+import numpy as np
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
+from app.multi_dimensional_scale import MultiDimensionalScale, CharacterSteeringProfile, DIMENSION_ORDER
 
 
 # Character definitions based on tea party image
@@ -77,6 +79,14 @@ CHARACTERS = [
     }
 ]
 
+# Read-only lookups over CHARACTERS
+CHARACTERS_BY_ID: Mapping[str, Dict] = MappingProxyType({c["id"]: c for c in CHARACTERS})
+CHARACTERS_BY_NAME: Mapping[str, Dict] = MappingProxyType({c["name"]: c for c in CHARACTERS})
+
+# Default dials, one row per character in CHARACTERS order, columns in DIMENSION_ORDER
+DEFAULT_DIALS = np.array([[c["default_dials"][dim] for dim in DIMENSION_ORDER] for c in CHARACTERS])
+DEFAULT_DIALS.flags.writeable = False
+
 
 class TeaPartyCharacterManager:
     """Manages all 5 tea party characters with their steering profiles"""
@@ -84,21 +94,25 @@ class TeaPartyCharacterManager:
     def __init__(self):
         self.scale = MultiDimensionalScale()
         self.characters: Dict[str, CharacterSteeringProfile] = {}
+        # All characters' dials in one (n_characters, n_dims) array; each
+        # profile writes through its own row
+        self.dials = np.empty((len(CHARACTERS), len(DIMENSION_ORDER)))
+        self.char_idx: Dict[str, int] = {c["id"]: i for i, c in enumerate(CHARACTERS)}
         self._initialize_characters()
     
     def _initialize_characters(self):
         """Create steering profiles for all characters"""
-        for char_data in CHARACTERS:
+        for i, char_data in enumerate(CHARACTERS):
             profile = CharacterSteeringProfile(
                 character_id=char_data["id"],
                 character_name=char_data["name"],
                 base_personality=char_data["base_personality"],
-                scale=self.scale
+                scale=self.scale,
+                dials=self.dials[i]
             )
             
             # Set default dial values
-            for dim, value in char_data["default_dials"].items():
-                profile.update_dial(dim, value)
+            profile.set_dials(DEFAULT_DIALS[i])
             
             self.characters[char_data["id"]] = profile
     
@@ -120,19 +134,19 @@ class TeaPartyCharacterManager:
             char_id = char_data["id"]
             profile = self.characters[char_id]
             
-            state = profile.get_current_state()
-            state.update({
+            # get_current_state() is cached and shared; extend a copy
+            states.append({
+                **profile.get_current_state(),
                 "appearance": char_data["appearance"],
                 "position": char_data["position"]
             })
-            states.append(state)
         
         return states
     
     def get_character_info(self, character_id: str) -> Dict:
         """Get complete info for a character including metadata"""
-        char_data = next((c for c in CHARACTERS if c["id"] == character_id), None)
-        if not char_data:
+        char_data = CHARACTERS_BY_ID.get(character_id)
+        if char_data is None:
             raise ValueError(f"Unknown character: {character_id}")
         
         profile = self.characters[character_id]
@@ -145,13 +159,11 @@ class TeaPartyCharacterManager:
     
     def reset_character_dials(self, character_id: str):
         """Reset a character's dials to defaults"""
-        char_data = next((c for c in CHARACTERS if c["id"] == character_id), None)
-        if not char_data:
+        index = self.char_idx.get(character_id)
+        if index is None:
             raise ValueError(f"Unknown character: {character_id}")
         
-        profile = self.characters[character_id]
-        for dim, value in char_data["default_dials"].items():
-            profile.update_dial(dim, value)
+        self.characters[character_id].set_dials(DEFAULT_DIALS[index])
     
     def reset_all_dials(self):
         """Reset all characters to their default dial values"""
@@ -160,6 +172,6 @@ class TeaPartyCharacterManager:
 
 
 # Helper function to get character by name
-def get_character_by_name(name: str) -> Dict:
+def get_character_by_name(name: str) -> Optional[Dict]:
     """Get character data by name"""
-    return next((c for c in CHARACTERS if c["name"] == name), None)
+    return CHARACTERS_BY_NAME.get(name)
@@ -5,7 +5,10 @@ Orchestrates multi-character conversations with steering vectors
 and video generation.
 """
 import asyncio
-from typing import List, Dict, Optional
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Callable, List, Dict, Optional, Tuple
 from datetime import datetime
 from openai import AsyncOpenAI
 import os
@@ -13,6 +16,93 @@ import random
 
 from app.tea_party_characters import TeaPartyCharacterManager, CHARACTERS
 from app.veo_video_generator import get_veo_generator
+from app._threads import to_thread_fast
+
+
+# LLM responses and generated videos kept for repeated requests
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_THRESHOLD = 0.93
+VIDEO_CACHE_SIZE = 128
+
+
+def _cache_key(*parts: str) -> str:
+    """sha256 over the parts, separated so ("ab", "c") != ("a", "bc")"""
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+class _ResponseCache:
+    """
+    Two-layer cache of LLM responses
+    
+    Exact layer: sha256 of (model, character, system prompt, user prompt).
+    The steering prompt is built from dials binned at 0.01, so this is the
+    same as keying on the dials rounded to 2 decimals plus topic/context.
+    
+    Semantic layer (only once an encoder is set): a user prompt whose
+    embedding has cosine similarity >= `threshold` with a cached one for the
+    same model, character and exact system prompt (i.e. the same dial
+    instructions) reuses that response. Embeddings live in a
+    (capacity, dim) ring, overwritten oldest first.
+    """
+    
+    def __init__(self, capacity: int = RESPONSE_CACHE_SIZE, threshold: float = RESPONSE_CACHE_THRESHOLD):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.encoder: Optional[Callable[[List[str]], Any]] = None
+        self._exact: "OrderedDict[str, str]" = OrderedDict()
+        self._embeddings: Optional[np.ndarray] = None
+        self._entries: List[Optional[Tuple[Tuple[str, str, str], str]]] = [None] * capacity
+        self._next = 0
+    
+    def get(self, key: str) -> Optional[str]:
+        """Exact-layer lookup"""
+        text = self._exact.get(key)
+        if text is not None:
+            self._exact.move_to_end(key)
+        return text
+    
+    async def embed(self, prompt: str) -> Optional[np.ndarray]:
+        """Unit-norm (dim,) embedding of `prompt`, or None without an encoder"""
+        if self.encoder is None:
+            return None
+        try:
+            embeddings = await to_thread_fast(self.encoder, [prompt])
+        except Exception as e:
+            print(f"⚠️ Response cache embedding failed: {e}")
+            return None
+        if embeddings is None:
+            return None
+        return np.asarray(embeddings, dtype=np.float32)[0]
+    
+    def nearest(self, scope: Tuple[str, str, str], embedding: np.ndarray) -> Optional[str]:
+        """Semantic-layer lookup among entries with the same (model, character, system prompt hash)"""
+        if self._embeddings is None:
+            return None
+        sims = self._embeddings @ embedding
+        for slot in np.argsort(sims)[::-1]:
+            if sims[slot] < self.threshold:
+                break
+            entry = self._entries[slot]
+            if entry is not None and entry[0] == scope:
+                return entry[1]
+        return None
+    
+    def put(self, key: str, scope: Tuple[str, str, str], embedding: Optional[np.ndarray], text: str):
+        """Store a response in the exact layer and, with an embedding, the semantic layer"""
+        self._exact[key] = text
+        if len(self._exact) > self.capacity:
+            self._exact.popitem(last=False)
+        
+        if embedding is None:
+            return
+        if self._embeddings is None or self._embeddings.shape[1] != embedding.shape[0]:
+            self._embeddings = np.zeros((self.capacity, embedding.shape[0]), dtype=np.float32)
+            self._entries = [None] * self.capacity
+            self._next = 0
+        slot = self._next % self.capacity
+        self._embeddings[slot] = embedding
+        self._entries[slot] = (scope, text)
+        self._next += 1
 
 
 class ConversationTurn:
@@ -34,6 +124,7 @@ class ConversationTurn:
         self.dial_values = dial_values or {}
         self.model = model
         self.timestamp = datetime.now()
+        self._timestamp_iso = self.timestamp.isoformat()  # sent with every to_dict()
     
     def to_dict(self) -> Dict:
         return {
@@ -43,7 +134,7 @@ class ConversationTurn:
             "video_url": self.video_url,
             "dial_values": self.dial_values,
             "model": self.model,
-            "timestamp": self.timestamp.isoformat()
+            "timestamp": self._timestamp_iso
         }
 
 
@@ -90,13 +181,28 @@ class TeaPartyConversationEngine:
         self.veo_generator = get_veo_generator()
         self.conversation_history: List[ConversationTurn] = []
         self.current_topic = "tea and pastries"
+        
+        # Repeated turns (e.g. scrubbing a dial back and forth) skip the LLM / Veo calls
+        self._response_cache = _ResponseCache()
+        self._video_cache: "OrderedDict[str, str]" = OrderedDict()
+    
+    def set_cache_encoder(self, encoder: Optional[Callable[[List[str]], Any]]):
+        """
+        Enable the semantic layer of the response cache
+        
+        Args:
+            encoder: Maps a list of texts to unit-norm (n, dim) embeddings,
+                     e.g. SemanticDialValidator.embed
+        """
+        self._response_cache.encoder = encoder
     
     async def generate_response(
         self,
         character_id: str,
         context: Optional[str] = None,
         generate_video: bool = True,
-        model: str = "gpt-4"
+        model: str = "gpt-4",
+        add_to_history: bool = True
     ) -> ConversationTurn:
         """
         Generate a character's response based on their current dial settings
@@ -105,6 +211,7 @@ class TeaPartyConversationEngine:
             character_id: ID of the character speaking
             context: Optional context or prompt for the response
             generate_video: Whether to generate video (takes 11s-6min)
+            add_to_history: Append the turn to conversation_history
         
         Returns:
             ConversationTurn object
@@ -132,7 +239,7 @@ class TeaPartyConversationEngine:
 Respond as {profile.character_name} in 2-3 sentences. Follow your emotional state exactly."""
         
         # Generate text response with specified model
-        response_text = await self._generate_text_response(system_prompt, user_prompt, model)
+        response_text = await self._generate_text_response(system_prompt, user_prompt, model, character_id)
         
         # Create turn object
         turn = ConversationTurn(
@@ -145,27 +252,54 @@ Respond as {profile.character_name} in 2-3 sentences. Follow your emotional stat
         
         # Generate video if requested
         if generate_video:
-            video_result = await self.veo_generator.generate_character_video(
-                character_name=profile.character_name,
-                character_appearance=char_info["appearance"],
-                dialogue=response_text,
-                scene_description="elegant tea party with ornate decorations and warm lighting"
-            )
-            
-            if video_result.get("status") == "completed":
-                turn.video_url = video_result["video_url"]
+            video_key = _cache_key(character_id, response_text)
+            turn.video_url = self._video_cache.get(video_key)
+            if turn.video_url is None:
+                video_result = await self.veo_generator.generate_character_video(
+                    character_name=profile.character_name,
+                    character_appearance=char_info["appearance"],
+                    dialogue=response_text,
+                    scene_description="elegant tea party with ornate decorations and warm lighting"
+                )
+                
+                if video_result.get("status") == "completed":
+                    turn.video_url = video_result["video_url"]
+                    self._video_cache[video_key] = turn.video_url
+                    if len(self._video_cache) > VIDEO_CACHE_SIZE:
+                        self._video_cache.popitem(last=False)
         
         # Add to history
-        self.conversation_history.append(turn)
+        if add_to_history:
+            self.conversation_history.append(turn)
         
         return turn
     
-    async def _generate_text_response(self, system_prompt: str, user_prompt: str, model: str = "gpt-4") -> str:
-        """Generate text response using specified LLM model"""
+    async def _generate_text_response(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str = "gpt-4",
+        character_id: str = ""
+    ) -> str:
+        """Generate text response using specified LLM model, reusing cached responses"""
         try:
             # Get the model string
             model_string = self.available_models.get(model, self.available_models["gpt-4"])
             
+            key = _cache_key(model_string, character_id, system_prompt, user_prompt)
+            cached = self._response_cache.get(key)
+            if cached is not None:
+                return cached
+            
+            # The system prompt carries the dial instructions, so it must match
+            # exactly; only the topic/context in the user prompt is fuzzy
+            scope = (model_string, character_id, _cache_key(system_prompt))
+            embedding = await self._response_cache.embed(user_prompt)
+            if embedding is not None:
+                cached = self._response_cache.nearest(scope, embedding)
+                if cached is not None:
+                    return cached
+            
             # Use new OpenAI client API
             response = await self.client.chat.completions.create(
                 model=model_string,
@@ -177,7 +311,10 @@ Respond as {profile.character_name} in 2-3 sentences. Follow your emotional stat
                 temperature=1.2  # Higher temperature for more varied, extreme responses
             )
             
-            return response.choices[0].message.content.strip()
+            text = response.choices[0].message.content.strip()
+            # Fallback quotes below are never cached
+            self._response_cache.put(key, scope, embedding, text)
+            return text
         except Exception as e:
             print(f"❌ LLM API error ({model}): {e}")
             print(f"   System prompt length: {len(system_prompt)}")
@@ -266,7 +403,8 @@ Respond as {profile.character_name} in 2-3 sentences. Follow your emotional stat
         Args:
             character_order: List of character IDs in speaking order
                            (defaults to seating order)
-            generate_videos: Whether to generate videos
+            generate_videos: Whether to generate videos (turns then run one
+                             at a time; without videos they run concurrently)
         
         Returns:
             List of conversation turns
@@ -274,6 +412,28 @@ Respond as {profile.character_name} in 2-3 sentences. Follow your emotional stat
         if character_order is None:
             character_order = [c["id"] for c in CHARACTERS]
         
+        if not generate_videos:
+            # Text-only turns are independent LLM calls: run them concurrently,
+            # then record them in speaking order
+            results = await asyncio.gather(*[
+                self.generate_response(
+                    character_id=char_id,
+                    generate_video=False,
+                    model=model,
+                    add_to_history=False
+                )
+                for char_id in character_order
+            ], return_exceptions=True)
+            
+            turns = []
+            for char_id, result in zip(character_order, results):
+                if isinstance(result, Exception):
+                    print(f"❌ Turn failed for {char_id}: {result}")
+                    continue
+                turns.append(result)
+            self.conversation_history.extend(turns)
+            return turns
+        
         turns = []
         for char_id in character_order:
             turn = await self.generate_response(
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test that the optimized dial scoring and PCA code match the original formulas
+
+- calculate_dial_score vs the original sorted-key dict cosine
+- calculate_dial_scores (vectorized) vs calculate_dial_score per document
+- _derive_semantic_dimensions (thin SVD) vs sklearn PCA components and signs
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sklearn.decomposition import PCA
+
+from app.utils import DIAL_NAMES, calculate_dial_score, calculate_dial_scores, dials_to_array
+from app.steering import SteeringVectorEngine
+
+N_TRIALS = 500
+rng = np.random.default_rng(0)
+
+
+def baseline_dial_score(user_dials, doc_dials):
+    """calculate_dial_score as originally written"""
+    common_keys = set(user_dials.keys()) & set(doc_dials.keys())
+    
+    if not common_keys:
+        return 0.5
+    
+    user_vector = np.array([user_dials[k] for k in sorted(common_keys)])
+    doc_vector = np.array([doc_dials[k] for k in sorted(common_keys)])
+    
+    dot_product = np.dot(user_vector, doc_vector)
+    user_norm = np.linalg.norm(user_vector)
+    doc_norm = np.linalg.norm(doc_vector)
+    
+    if user_norm == 0 or doc_norm == 0:
+        return 0.5
+    
+    similarity = dot_product / (user_norm * doc_norm)
+    return (similarity + 1) / 2
+
+
+def random_dials(full=False):
+    """Random dial dict; partial key sets and all-zero values included"""
+    if full:
+        names = DIAL_NAMES
+    else:
+        names = [n for n in DIAL_NAMES if rng.random() < 0.6]
+    if rng.random() < 0.1:
+        return {n: 0.0 for n in names}
+    return {n: float(rng.uniform(-1, 1)) for n in names}
+
+
+def test_dial_score_matches_baseline():
+    """Single-pass dial score equals the sorted-key dict cosine"""
+    print("\n📊 Test 1: calculate_dial_score vs original formula")
+    
+    for _ in range(N_TRIALS):
+        user, doc = random_dials(), random_dials()
+        expected = baseline_dial_score(user, doc)
+        actual = calculate_dial_score(user, doc)
+        assert np.isclose(actual, expected, rtol=1e-12, atol=1e-12), (user, doc, actual, expected)
+    
+    # Edge cases: no common keys, zero vectors
+    assert calculate_dial_score({}, {'love': 1.0}) == 0.5
+    assert calculate_dial_score({'love': 1.0}, {'trust': 1.0}) == 0.5
+    assert calculate_dial_score({'love': 0.0}, {'love': 1.0}) == 0.5
+    
+    print(f"  ✓ {N_TRIALS} random pairs match")
+
+
+def test_vectorized_scores_match_scalar():
+    """Vectorized dial scores equal calculate_dial_score row by row"""
+    print("\n📊 Test 2: calculate_dial_scores vs calculate_dial_score")
+    
+    docs = [random_dials(full=True) for _ in range(N_TRIALS)]
+    doc_matrix = np.stack([dials_to_array(d) for d in docs])
+    doc_norms = np.linalg.norm(doc_matrix, axis=1)
+    
+    for _ in range(20):
+        user = random_dials(full=True)
+        expected = np.array([calculate_dial_score(user, d) for d in docs])
+        
+        scores = calculate_dial_scores(dials_to_array(user), doc_matrix)
+        scores_with_norms = calculate_dial_scores(dials_to_array(user), doc_matrix, doc_norms)
+        
+        assert np.allclose(scores, expected, rtol=1e-6, atol=1e-6)
+        assert np.allclose(scores_with_norms, expected, rtol=1e-6, atol=1e-6)
+    
+    print(f"  ✓ {N_TRIALS} documents x 20 users match")
+
+
+def test_semantic_dimensions_match_pca():
+    """Thin-SVD dimensions equal sklearn PCA components, signs included"""
+    print("\n📊 Test 3: _derive_semantic_dimensions vs sklearn PCA")
+    
+    for n_pairs, dim in [(6, 16), (12, 32), (40, 8)]:
+        positive = rng.normal(size=(n_pairs, dim)).astype(np.float32)
+        negative = rng.normal(size=(n_pairs, dim)).astype(np.float32)
+        
+        engine = SimpleNamespace(steering_vectors={}, vector_stats={})
+        SteeringVectorEngine._derive_semantic_dimensions(engine, positive, negative, {})
+        
+        differences = positive - negative
+        pca = PCA(n_components=min(5, n_pairs), svd_solver='full')
+        pca.fit(differences)
+        
+        for pc_idx, dimension in [(1, 'commitment'), (2, 'trust'), (3, 'belonging'), (4, 'growth')]:
+            expected = pca.components_[pc_idx] / (np.linalg.norm(pca.components_[pc_idx]) + 1e-8)
+            actual = engine.steering_vectors[dimension]
+            
+            assert np.allclose(actual, expected, atol=1e-4), (n_pairs, dim, dimension)
+            assert np.isclose(
+                engine.vector_stats[dimension]['variance_explained'],
+                pca.explained_variance_ratio_[pc_idx],
+                atol=1e-5
+            )
+        
+        print(f"  ✓ {n_pairs} pairs x {dim} dims match")
+    
+    # Fewer than 5 pairs: nothing derived
+    engine = SimpleNamespace(steering_vectors={}, vector_stats={})
+    SteeringVectorEngine._derive_semantic_dimensions(
+        engine, rng.normal(size=(4, 8)), rng.normal(size=(4, 8)), {}
+    )
+    assert engine.steering_vectors == {}
+
+
+if __name__ == "__main__":
+    print("🔬 Testing optimized scoring against original formulas")
+    print("=" * 70)
+    
+    test_dial_score_matches_baseline()
+    test_vectorized_scores_match_scalar()
+    test_semantic_dimensions_match_pca()
+    
+    print("\n✅ All equivalence tests passed")
@@ -6,6 +6,11 @@ import json
 from typing import List, Dict, Optional
 from pathlib import Path
 import re
+import numpy as np
+
+
+# Canonical dial order for vectorized dial math
+DIAL_NAMES = ("love", "commitment", "belonging", "trust", "growth")
 
 
 def load_config(config_path: str = "config.json") -> Dict:
@@ -144,25 +149,26 @@ def calculate_dial_score(user_dials: Dict[str, float], doc_dials: Dict[str, floa
     Returns:
         Alignment score between 0 and 1 (higher = better match)
     """
-    # Get common dial keys
-    common_keys = set(user_dials.keys()) & set(doc_dials.keys())
-    
-    if not common_keys:
+    # One pass over the common keys; pairing, not key order, is what matters
+    dot_product = user_norm_sq = doc_norm_sq = 0.0
+    has_common = False
+    for key, u in user_dials.items():
+        d = doc_dials.get(key)
+        if d is None:
+            continue
+        has_common = True
+        dot_product += u * d
+        user_norm_sq += u * u
+        doc_norm_sq += d * d
+    
+    if not has_common:
         return 0.5  # Neutral score if no common dials
     
-    # Extract vectors
-    user_vector = [user_dials[key] for key in sorted(common_keys)]
-    doc_vector = [doc_dials[key] for key in sorted(common_keys)]
-    
-    # Calculate cosine similarity
-    dot_product = sum(u * d for u, d in zip(user_vector, doc_vector))
-    user_norm = sum(u ** 2 for u in user_vector) ** 0.5
-    doc_norm = sum(d ** 2 for d in doc_vector) ** 0.5
-    
-    if user_norm == 0 or doc_norm == 0:
+    if user_norm_sq == 0 or doc_norm_sq == 0:
         return 0.5
     
-    similarity = dot_product / (user_norm * doc_norm)
+    # Calculate cosine similarity
+    similarity = dot_product / (user_norm_sq * doc_norm_sq) ** 0.5
     
     # Normalize to [0, 1] range (cosine similarity is [-1, 1])
     normalized_score = (similarity + 1) / 2
@@ -170,6 +176,39 @@ def calculate_dial_score(user_dials: Dict[str, float], doc_dials: Dict[str, floa
     return normalized_score
 
 
+def dials_to_array(dials: Dict[str, float]) -> np.ndarray:
+    """Dial dict -> float32 vector of shape (len(DIAL_NAMES),) in DIAL_NAMES order"""
+    return np.asarray([dials.get(name, 0.5) for name in DIAL_NAMES], dtype=np.float32)
+
+
+def calculate_dial_scores(
+    dials_vec: np.ndarray,
+    doc_dial_matrix: np.ndarray,
+    doc_dial_norms: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Vectorized calculate_dial_score over many documents
+    
+    Args:
+        dials_vec: User dial vector, shape (n_dials,)
+        doc_dial_matrix: Document dial annotations, shape (n_docs, n_dials)
+        doc_dial_norms: Optional precomputed row norms of doc_dial_matrix
+    
+    Returns:
+        Alignment scores between 0 and 1, shape (n_docs,)
+    """
+    if doc_dial_norms is None:
+        doc_dial_norms = np.linalg.norm(doc_dial_matrix, axis=1)
+    
+    dot_products = doc_dial_matrix @ dials_vec
+    norms = doc_dial_norms * np.linalg.norm(dials_vec)
+    
+    # Neutral score where either vector is all zeros
+    safe_norms = np.where(norms == 0, 1.0, norms)
+    scores = (dot_products / safe_norms + 1) / 2
+    return np.where(norms == 0, 0.5, scores)
+
+
 def initialize_vector_store(path: str):
     """Initialize vector store directory"""
     Path(path).mkdir(parents=True, exist_ok=True)
@@ -11,6 +11,8 @@ from typing import Optional, Dict, List
 import google.generativeai as genai
 from google.api_core import retry
 
+from app._threads import to_thread_fast
+
 
 class VeoVideoGenerator:
     """Handles video generation using Google Veo 3.1"""
@@ -71,7 +73,7 @@ class VeoVideoGenerator:
         # Add reference image if provided
         if reference_image_path and os.path.exists(reference_image_path):
             # Upload reference image
-            reference_file = genai.upload_file(reference_image_path)
+            reference_file = await to_thread_fast(genai.upload_file, reference_image_path)
             generation_config["reference_images"] = [{
                 "image": reference_file,
                 "character_id": character_name
@@ -80,7 +82,9 @@ class VeoVideoGenerator:
         try:
             # Start video generation (async operation)
             print(f"🎬 Generating video for {character_name}...")
-            operation = self.model.generate_video(
+            # Blocking SDK call: keep it off the event loop
+            operation = await to_thread_fast(
+                self.model.generate_video,
                 prompt=prompt,
                 **generation_config
             )
@@ -142,7 +146,7 @@ Include natural ambient sounds: gentle conversation, teacups clinking, soft back
         """
         start_time = time.time()
         
-        while not operation.done():
+        while not await to_thread_fast(operation.done):
             if time.time() - start_time > timeout_seconds:
                 raise TimeoutError(f"Video generation timed out after {timeout_seconds}s")
             
@@ -151,7 +155,7 @@ Include natural ambient sounds: gentle conversation, teacups clinking, soft back
             print("⏳ Video still generating...")
         
         # Get the video URL
-        result = operation.result()
+        result = await to_thread_fast(operation.result)
         video_url = result.video.url
         
         print(f"✅ Video generated: {video_url}")
@@ -183,7 +187,8 @@ Camera slowly pushes in on the group as they engage in animated conversation. So
 Include ambient sounds: gentle laughter, tea being poured, soft clinking of cups, pleasant background music."""
         
         try:
-            operation = self.model.generate_video(
+            operation = await to_thread_fast(
+                self.model.generate_video,
                 prompt=prompt,
                 duration_seconds=duration_seconds,
                 aspect_ratio="16:9",
@@ -258,7 +263,7 @@ Include ambient sounds: gentle conversation, teacups clinking, soft laughter, pl
         
         # Add reference image for character consistency
         if reference_image_path and os.path.exists(reference_image_path):
-            reference_file = genai.upload_file(reference_image_path)
+            reference_file = await to_thread_fast(genai.upload_file, reference_image_path)
             generation_config["reference_images"] = [{
                 "image": reference_file,
                 "id": "tea_party_scene"
@@ -267,7 +272,8 @@ Include ambient sounds: gentle conversation, teacups clinking, soft laughter, pl
         
         try:
             print(f"\n🎬 Generating conversation video with {len(character_responses)} characters...")
-            operation = self.model.generate_video(
+            operation = await to_thread_fast(
+                self.model.generate_video,
                 prompt=prompt,
                 **generation_config
             )